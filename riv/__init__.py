@@ -1,5 +1,8 @@
 class RestResponse(object):
 
-    def __init__(self, content=None, form=None):
+    def __init__(self, content=None, form=None, items=None):
         self.content = content
         self.form = form
+        # The result of each entity of a batch request, e.g.
+        # {'status': 201, 'object': obj} or {'status': 400, 'error': ...}.
+        self.items = items
@@ -1,5 +1,34 @@
-from django.conf.urls import patterns
+import json
+import re
+from StringIO import StringIO
+
+from django.conf import settings
+from django.conf.urls import patterns, url
+from django.core import serializers
+from django.core.handlers.wsgi import WSGIRequest
+from django.core.urlresolvers import reverse, NoReverseMatch, get_script_prefix, get_urlconf, RegexURLResolver, Resolver404
+from django.db import DEFAULT_DB_ALIAS, router, transaction
+from django.http import Http404, HttpResponse, HttpResponseBadRequest
+from django.views.decorators.csrf import csrf_exempt
+from riv import idempotency, limits
 from riv.exceptions import ConfigurationError
+from riv.http import HttpResponseNotAllowed, HttpResponseUnsupportedMediaType
+from riv.mime import formats, get_available_format, get_mime_for_format
+
+ID_RE = re.compile(r'^\d+$')
+ID_LIST_RE = re.compile(r'^\d[;\d]+$')
+
+# The methods of the requests of a batch.
+BATCH_METHODS = ('GET', 'HEAD', 'POST', 'PUT', 'DELETE')
+
+# All Api instances by name.
+_apis = {}
+
+def get_api(name):
+    """
+    Returns the Api with the given name or None.
+    """
+    return _apis.get(name)
 
 class Api(object):
     """
@@ -9,9 +38,25 @@ class Api(object):
     It also allows to register the same resource with multiple
     different apis.
     """
-    def __init__(self, name):
+    def __init__(self, name, idempotency_keys=False, max_concurrent_requests=None, max_queued_requests=0, queue_timeout=10):
         self.name = name
+        # Replay the response of batch requests repeated with the same
+        # Idempotency-Key header.
+        self.idempotency_keys = idempotency_keys
+        # Limits the requests handled by all resources at the same time.
+        self.limiter = None
+        if max_concurrent_requests:
+            self.limiter = limits.ConcurrencyLimiter(max_concurrent_requests, max_queued_requests, queue_timeout)
         self._resource_list = {}
+        self._resources_by_name = {}
+        # Model -> resource used to build the URIs of its objects.
+        self._resources_by_model = {}
+        # (model, urlconf, script prefix) -> URL of the list resource.
+        self._url_prefixes = {}
+        self._urls = None
+        # Resolver of the named patterns of the resources, see reverse().
+        self._reverse_resolver = None
+        _apis[name] = self
 
     def register(self, resource):
         name = getattr(resource._meta, 'name')
@@ -24,17 +69,277 @@ class Api(object):
                 self._resource_list[resource._meta.model] = {name: resource}
         else:
             self._resource_list[name] = {name: resource}
+        self._resources_by_name[name] = resource
         resource._meta.api_name = self.name
+        self._update_index(resource._meta.model)
 
     def unregister(self, resource):
         name = getattr(resource._meta, 'name')
         if not name:
             raise ConfigurationError("Resource %s does not have a name assigned." % (resource,))
-        if name in self._resource_list:
-            del self._resource_list[name]
+        key = resource._meta.model or name
+        if key in self._resource_list:
+            self._resource_list[key].pop(name, None)
+            if not self._resource_list[key]:
+                del self._resource_list[key]
+        self._resources_by_name.pop(name, None)
+        self._update_index(resource._meta.model)
+
+    def _update_index(self, model):
+        if model:
+            resources = self._resource_list.get(model, {}).values()
+            if len(resources) > 1:
+                resources = [r for r in resources if r._meta.reverse][:1]
+            if resources:
+                self._resources_by_model[model] = resources[0]
+            else:
+                self._resources_by_model.pop(model, None)
+        self._url_prefixes = {}
+        self._urls = None
+        self._reverse_resolver = None
+
+    def get_concurrency_stats(self):
+        """
+        Returns the counters of the concurrency limits of the Api and of
+        its resources, e.g. to publish them to a monitoring system.
+        """
+        return {
+            'api': self.limiter and self.limiter.get_stats(),
+            'resources': dict(
+                (name, resource.get_concurrency_stats())
+                for (name, resource) in self._resources_by_name.items()
+                if resource.limiter is not None
+            ),
+        }
+
+    def get_resource(self, name):
+        """
+        Returns the resource registered with the given name or None.
+        """
+        return self._resources_by_name.get(name)
+
+    def get_resource_for_model(self, model):
+        """
+        Returns the resource used to build URIs for objects of the
+        given model or None.
+        """
+        if getattr(model, '_deferred', False):
+            model = model._meta.proxy_for_model
+        return self._resources_by_model.get(model)
+
+    def get_url_for_pk(self, model, pk):
+        """
+        Returns the URI of the object with the given primary key. If
+        no resource is registered for the model the primary key itself
+        is returned.
+        """
+        resource = self.get_resource_for_model(model)
+        if resource is None or not ID_RE.match(unicode(pk)):
+            return pk
+        key = (resource._meta.model, get_urlconf(), get_script_prefix())
+        try:
+            prefix = self._url_prefixes[key]
+        except KeyError:
+            try:
+                prefix = self.reverse('list-%s-%s' % (self.name, resource._meta.model._meta))
+            except NoReverseMatch:
+                prefix = None
+            self._url_prefixes[key] = prefix
+        if prefix is None:
+            return pk
+        return '%s/%s' % (prefix, pk)
+
+    def reverse(self, viewname, args=None, kwargs=None):
+        """
+        Returns the URL of a named pattern of a resource, e.g.
+        'object-<api name>-<app>.<model>'. The patterns are not part of
+        the URLconf, so the prefix of the Api is taken from its batch
+        pattern. Raises NoReverseMatch if the Api is not included in
+        the URLconf.
+        """
+        self._get_urls()
+        batch_url = reverse('batch-%s' % (self.name,))
+        prefix = batch_url[:batch_url.rindex('batch')]
+        return prefix + self._reverse_resolver.reverse(viewname, *(args or ()), **(kwargs or {}))
+
+    @csrf_exempt
+    def dispatch(self, request, path):
+        """
+        Passes the request to the resource addressed by the path. The
+        path is either '<name>', '<name>/<id>' or '<name>/<id>;<id>;...'.
+        """
+        resource = self._resources_by_name.get(path)
+        if resource:
+            return resource.handle_request(request)
+        try:
+            name, ids = path.rsplit('/', 1)
+            resource = self._resources_by_name[name]
+        except (ValueError, KeyError):
+            raise Http404()
+        if ID_RE.match(ids):
+            return resource.handle_request(request, id=ids)
+        elif ID_LIST_RE.match(ids):
+            return resource.handle_request(request, id_list=ids)
+        raise Http404()
+
+    @csrf_exempt
+    def dispatch_export(self, request, name, job_id):
+        try:
+            resource = self._resources_by_name[name]
+        except KeyError:
+            raise Http404()
+        return resource.handle_export(request, job_id)
+
+    @csrf_exempt
+    def handle_batch(self, request):
+        """
+        Executes a list of requests of the form {method, path, body} and
+        returns their results in one response. The paths are relative
+        to the Api. If the "atomic" parameter is set all requests are
+        executed in one transaction per database the resources write to,
+        which are rolled back if one of the requests fails. Otherwise the
+        response has the status 207 if a request fails.
+        """
+        if self.idempotency_keys:
+            return idempotency.call_once(request, self.name, self._handle_batch)
+        return self._handle_batch(request)
+
+    def _handle_batch(self, request):
+        if request.method != 'POST':
+            return HttpResponseNotAllowed(allow_headers=['POST'])
+
+        format = get_available_format(request) or 'json'
+        try:
+            Loader = serializers.get_serializer('rest%s' % (formats[request.META.get('CONTENT_TYPE', 'application/json')],))().get_loader()
+        except (KeyError, serializers.base.SerializerDoesNotExist):
+            return HttpResponseUnsupportedMediaType()
+        try:
+            loader = Loader()
+            loader.load(request)
+            operations = loader.get_objects()
+        except Exception:
+            return HttpResponseBadRequest()
+        if not operations or len(operations) > getattr(settings, 'RIV_BATCH_MAX_REQUESTS', 50) or \
+        not all(self._is_batch_operation(op) for op in operations):
+            return HttpResponseBadRequest()
+
+        # The prefix of the Api in the URL, e.g. "/rest/" for "/rest/batch".
+        prefix = request.path[:request.path.rstrip('/').rindex('/') + 1]
+        resolver = RegexURLResolver(r'^', self.urls)
+
+        results = []
+        status = 200
+
+        def handle_operations():
+            for op in operations:
+                results.append(self._handle_batch_operation(request, resolver, prefix, op))
+            if any(result['status'] >= 400 for result in results):
+                raise _BatchFailed()
+
+        if 'atomic' in request.GET:
+            try:
+                self._atomic(self._get_databases(), handle_operations)
+            except _BatchFailed:
+                # None of the requests has been applied.
+                status = 400
+        else:
+            try:
+                handle_operations()
+            except _BatchFailed:
+                # Some of the requests have been applied.
+                status = 207
+
+        response = HttpResponse(status=status, content_type=get_mime_for_format(format))
+        response.content = serializers.serialize('rest%s' % (format,), {'responses': results}, render_only=True)
+        return response
+
+    def _is_batch_operation(self, op):
+        return isinstance(op, dict) and \
+            isinstance(op.get('method'), basestring) and op['method'].upper() in BATCH_METHODS and \
+            isinstance(op.get('path'), basestring) and op['path']
+
+    def _get_databases(self):
+        """
+        Returns the databases the registered resources write to.
+        """
+        databases = set(
+            router.db_for_write(resource._meta.model)
+            for resource in self._resources_by_name.values()
+            if resource._meta.model
+        )
+        return sorted(databases) or [DEFAULT_DB_ALIAS]
+
+    def _atomic(self, databases, func):
+        # Nests one transaction per database.
+        if not databases:
+            return func()
+        with transaction.atomic(using=databases[0]):
+            return self._atomic(databases[1:], func)
+
+    def _handle_batch_operation(self, request, resolver, prefix, op):
+        path, _, query_string = op['path'].partition('?')
+        if path.startswith(prefix):
+            path = path[len(prefix):]
+        try:
+            match = resolver.resolve(path)
+        except Resolver404:
+            return {'status': 404, 'headers': {}, 'body': None}
+        if match.func == self.handle_batch:
+            return {'status': 400, 'headers': {}, 'body': None}
+
+        body = ''
+        if op.get('body') is not None:
+            body = json.dumps(op['body'])
+        environ = request.environ.copy()
+        # The key belongs to the batch request.
+        environ.pop(idempotency.HEADER, None)
+        environ.update({
+            'REQUEST_METHOD': op['method'].upper(),
+            'PATH_INFO': prefix + path,
+            'QUERY_STRING': query_string,
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(body)),
+            # The results are parsed and serialized in the format of
+            # the batch response.
+            'HTTP_ACCEPT': 'application/json',
+            'wsgi.input': StringIO(body),
+        })
+        sub_request = WSGIRequest(environ)
+        for attr in ('user', 'session'):
+            if hasattr(request, attr):
+                setattr(sub_request, attr, getattr(request, attr))
+
+        try:
+            response = match.func(sub_request, *match.args, **match.kwargs)
+        except Http404:
+            return {'status': 404, 'headers': {}, 'body': None}
+
+        headers = dict((key, value) for key, value in response.items() if key.lower() != 'content-type')
+        content = getattr(response, 'streaming', False) and ''.join(response.streaming_content) or response.content
+        if not content:
+            content = None
+        else:
+            try:
+                content = json.loads(content)
+            except ValueError:
+                pass
+        return {'status': response.status_code, 'headers': headers, 'body': content}
 
     def _get_urls(self):
-        urlpatterns = patterns('')
+        if self._urls is not None:
+            return self._urls
+        # All requests are handled by a single pattern. Only the names of
+        # the registered resources are matched. Other paths are left to
+        # the patterns following the Api. The named patterns of the
+        # resources are kept in a separate resolver, which is only used
+        # to reverse URLs.
+        names = '|'.join([re.escape(name) for name in sorted(self._resources_by_name, key=len, reverse=True)]) or '(?!)'
+        urlpatterns = patterns('',
+            url(r'^batch/?$', self.handle_batch, name='batch-%s' % (self.name,)),
+            url(r'^(?P<name>%s)/exports/(?P<job_id>[0-9a-f]{32})/?$' % (names,), self.dispatch_export, name='export-%s' % (self.name,)),
+            url(r'^(?P<path>(?:%s)(?:/\d[;\d]*)?)/?$' % (names,), self.dispatch, name='dispatch-%s' % (self.name,)),
+        )
+        reverse_patterns = []
         for model_or_name,resources in self._resource_list.items():
             multiple_reverse_counter = 0
             if len(resources) > 1:
@@ -44,9 +349,14 @@ class Api(object):
                             raise ConfigurationError("Multiple resources in api '%s' with 'reverse=True' for model %s found" % (self.name, resource._meta.model))
                         else:
                             multiple_reverse_counter += 1
-                    urlpatterns += resource.urls
+                    reverse_patterns += resource.urls
             else:
-                urlpatterns += resources.values()[0].urls_with_reverse
+                reverse_patterns += resources.values()[0].urls_with_reverse
+        self._reverse_resolver = RegexURLResolver(r'^', reverse_patterns)
+        self._urls = urlpatterns
         return urlpatterns
 
     urls = property(_get_urls)
+
+class _BatchFailed(Exception):
+    pass
@@ -0,0 +1,256 @@
+"""
+Caches the serialized responses of GET requests.
+
+Cached responses are never deleted. Instead each model has a
+generation counter that is part of the keys of the responses depending
+on it. Saving or deleting an object of the model increments the
+counter, so the old responses are not found anymore and expire.
+
+Deletions are not tracked with signals: delete receivers would keep
+Django from deleting objects without loading them. Code deleting objects
+calls invalidate_deletion() instead.
+
+A change made in a transaction increments the counter before the
+transaction is committed. A concurrent request might cache the old data
+with the new generation. Thus, the counter is incremented again when the
+request making the change is finished.
+"""
+import hashlib
+import threading
+import time
+
+from django.core.cache import get_cache
+from django.core.signals import request_finished
+from django.db import router, transaction
+from django.db.models.fields import FieldDoesNotExist
+from django.db.models.signals import post_save, m2m_changed
+from django.http import HttpResponse
+from django.utils.encoding import force_bytes
+
+from riv.serializers.base_serializer import SEPARATOR
+
+DEFAULT_OPTIONS = {
+    'timeout': 300,
+    'alias': 'default',
+    'vary': ('format', 'query', 'user'),
+}
+
+# Model -> aliases of the caches containing responses depending on it.
+_tracked_models = {}
+
+_caches = {}
+
+# The models changed in a transaction by the current thread.
+_pending = threading.local()
+
+def get_response_cache(alias):
+    try:
+        return _caches[alias]
+    except KeyError:
+        cache = _caches[alias] = get_cache(alias)
+        return cache
+
+def get_generation_key(model):
+    return 'riv-cache-generation:%s' % (model._meta,)
+
+def invalidate(model, using=None):
+    """
+    Invalidates the cached responses depending on the model. If the
+    change hasn't been committed yet, they are invalidated again once
+    the current request is finished.
+    """
+    model = _get_concrete_model(model)
+    if model not in _tracked_models:
+        return
+    if transaction.get_connection(using or router.db_for_write(model)).in_atomic_block:
+        if not hasattr(_pending, 'models'):
+            _pending.models = set()
+        _pending.models.add(model)
+    _increment(model)
+
+def invalidate_deletion(model, using=None):
+    """
+    Invalidates the cached responses depending on the model or on the
+    models whose rows are deleted or unlinked along with its objects.
+    """
+    models = set()
+    pending = [_get_concrete_model(model)]
+    while pending:
+        current = pending.pop()
+        if current in models:
+            continue
+        models.add(current)
+        pending.extend(related.model for related in current._meta.get_all_related_objects(include_hidden=True))
+        # The other side of many-to-many relations loses the links.
+        pending.extend(field.rel.to for field in current._meta.many_to_many)
+        pending.extend(related.model for related in current._meta.get_all_related_many_to_many_objects())
+    for changed in models:
+        invalidate(changed, using)
+
+def invalidate_pending():
+    """
+    Invalidates the responses depending on the models changed in a
+    transaction by the current thread again. This happens when a
+    request is finished. Call it after committing changes made outside
+    of requests.
+    """
+    models = getattr(_pending, 'models', None)
+    if models:
+        _pending.models = set()
+        for model in models:
+            _increment(model)
+
+def _increment(model):
+    for alias in _tracked_models.get(model, ()):
+        cache = get_response_cache(alias)
+        key = get_generation_key(model)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # The counter has been evicted. A new one must not repeat
+            # an old generation.
+            cache.set(key, _new_generation(), None)
+
+def get_dependencies(model, names):
+    """
+    Returns the model and the models of the relations serialized with
+    it (e.g. "choice_set" or "poll__tags").
+    """
+    if model is None:
+        return set()
+    models = set([model])
+    for name in names:
+        current = model
+        for part in name.split(SEPARATOR):
+            current = _get_related_model(current, part)
+            if current is None:
+                break
+            models.add(current)
+    return models
+
+class ResponseCache(object):
+    """
+    Stores the responses of a resource in the cache given by the
+    ``cache`` option of the resource.
+    """
+    def __init__(self, meta):
+        options = dict(DEFAULT_OPTIONS)
+        if isinstance(meta.cache, dict):
+            options.update(meta.cache)
+        self.timeout = options['timeout']
+        self.alias = options['alias']
+        self.vary = options['vary']
+        self.models = sorted(
+            get_dependencies(meta.model, list(meta.inline or []) + list(meta.reverse_fields or [])),
+            key=lambda m: unicode(m._meta)
+        )
+        for model in self.models:
+            _tracked_models.setdefault(model, set()).add(self.alias)
+            _connect_receivers(model)
+
+    @property
+    def cache(self):
+        return get_response_cache(self.alias)
+
+    def get_key(self, request, format):
+        """
+        Returns the key of the response to the request or None if the
+        response can't be cached.
+        """
+        if 'HTTP_AUTHORIZATION' in request.META and 'authorization' not in self.vary:
+            # The credentials might be checked by the wrapper, which is
+            # not called for cached responses.
+            return None
+        generations = self.get_generations()
+        if generations is None:
+            return None
+        parts = [request.path] + generations
+        if 'format' in self.vary:
+            parts.append(format)
+        if 'query' in self.vary:
+            parts.append(repr(sorted(request.GET.lists())))
+        if 'user' in self.vary:
+            user = getattr(request, 'user', None)
+            parts.append(user.pk if user is not None and user.is_authenticated() else '')
+        if 'authorization' in self.vary:
+            parts.append(request.META.get('HTTP_AUTHORIZATION', ''))
+        return 'riv-cache:%s' % (hashlib.md5('\0'.join(force_bytes(part) for part in parts)).hexdigest(),)
+
+    def get(self, key, head=False):
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        response = HttpResponse(entry['content'], status=entry['status'])
+        for (header, value) in entry['headers']:
+            response[header] = value
+        if head:
+            response['Content-Length'] = str(len(entry['content']))
+            response.content = ''
+        return response
+
+    def set(self, key, response):
+        self.cache.set(key, {
+            'status': response.status_code,
+            'headers': response.items(),
+            'content': response.content,
+        }, self.timeout)
+
+    def get_generations(self):
+        """
+        Returns the generation counters of the models the responses
+        depend on or None if the cache doesn't store anything.
+        """
+        keys = [get_generation_key(model) for model in self.models]
+        generations = self.cache.get_many(keys)
+        for key in keys:
+            if key not in generations:
+                self.cache.add(key, _new_generation(), None)
+                generations[key] = self.cache.get(key)
+                if generations[key] is None:
+                    # The cache doesn't store anything.
+                    return None
+        return [generations[key] for key in keys]
+
+def _new_generation():
+    return int(time.time() * 1000)
+
+def _get_concrete_model(model):
+    if getattr(model, '_deferred', False):
+        model = model._meta.proxy_for_model
+    return model._meta.concrete_model
+
+def _get_related_model(model, name):
+    for related in model._meta.get_all_related_objects() + model._meta.get_all_related_many_to_many_objects():
+        if related.get_accessor_name() == name:
+            return related.model
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+    if field.rel:
+        return field.rel.to
+    return None
+
+def _model_changed(sender, using=None, **kwargs):
+    invalidate(sender, using)
+
+def _m2m_changed(sender, instance, model, action, using=None, **kwargs):
+    if action.startswith('post_'):
+        for changed in (type(instance), model):
+            invalidate(changed, using)
+
+def _request_finished(sender, **kwargs):
+    # The transactions of the request have been committed.
+    invalidate_pending()
+
+request_finished.connect(_request_finished, dispatch_uid='riv-cache-request-finished')
+
+def _connect_receivers(model):
+    # Receivers are only connected for the tracked models. There are no
+    # delete receivers (see invalidate_deletion).
+    uid = unicode(model._meta)
+    post_save.connect(_model_changed, sender=model, dispatch_uid='riv-cache-post-save-%s' % (uid,))
+    relations = [field.rel for field in model._meta.many_to_many] + \
+            [related.field.rel for related in model._meta.get_all_related_many_to_many_objects()]
+    for rel in relations:
+        m2m_changed.connect(_m2m_changed, sender=rel.through, dispatch_uid='riv-cache-m2m-changed-%s' % (rel.through._meta,))
@@ -0,0 +1,240 @@
+"""
+Export jobs serialize a list of objects in a background thread and
+store the result in a file. The state of each job is kept in a small
+JSON file next to the export, so no external broker is required.
+
+Jobs are removed RIV_EXPORT_TTL seconds after their last change. Jobs
+not finished within RIV_EXPORT_TIMEOUT seconds (e.g. because the
+process running them has been restarted) are reported as failed.
+"""
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+import Queue
+
+from django.conf import settings
+from django.core import serializers
+from django.core.urlresolvers import get_script_prefix, get_urlconf, set_script_prefix, set_urlconf
+from django.db import connections
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+# Expired jobs are removed at most once per interval (in seconds).
+CLEANUP_INTERVAL = 60
+
+JOB_FILE_RE = re.compile(r'^[0-9a-f]{32}\.')
+
+_queue = None
+_queue_lock = threading.Lock()
+_last_cleanup = 0
+
+def get_export_dir():
+    path = getattr(settings, 'RIV_EXPORT_DIR', None) or os.path.join(tempfile.gettempdir(), 'riv-exports')
+    if not os.path.isdir(path):
+        try:
+            os.makedirs(path)
+        except OSError:
+            # Another thread or process might have created it.
+            if not os.path.isdir(path):
+                raise
+    return path
+
+class ExportJob(object):
+
+    def __init__(self, job_id, resource_name, format, status=PENDING, error=None, created=None, started=None):
+        self.job_id = job_id
+        self.resource_name = resource_name
+        self.format = format
+        self.status = status
+        self.error = error
+        self.created = created or time.time()
+        self.started = started
+
+    @property
+    def state_path(self):
+        return os.path.join(get_export_dir(), '%s.state' % (self.job_id,))
+
+    @property
+    def data_path(self):
+        return os.path.join(get_export_dir(), '%s.%s' % (self.job_id, self.format))
+
+    @classmethod
+    def load(cls, job_id):
+        try:
+            with open(os.path.join(get_export_dir(), '%s.state' % (job_id,))) as f:
+                state = json.load(f)
+        except (IOError, ValueError):
+            return None
+        return cls(job_id, state['resource_name'], state['format'], state['status'], state.get('error'),
+                state.get('created'), state.get('started'))
+
+    def save(self):
+        state = {
+            'resource_name': self.resource_name,
+            'format': self.format,
+            'status': self.status,
+            'error': self.error,
+            'created': self.created,
+            'started': self.started,
+        }
+        # Write to a temporary file first. Readers never see a
+        # partially written state.
+        tmp_path = '%s.tmp' % (self.state_path,)
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.rename(tmp_path, self.state_path)
+
+    def delete(self):
+        for path in (self.data_path, self.state_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def is_stale(self, now=None):
+        """
+        Returns True if the job should have finished a long time ago.
+        Nobody is going to finish it anymore.
+        """
+        if self.status not in (PENDING, RUNNING):
+            return False
+        since = self.started if self.status == RUNNING else self.created
+        return (now or time.time()) - since > get_timeout()
+
+    def run(self, data, options, url_context=None):
+        """
+        Serializes the data. The URIs of the objects are built with the
+        script prefix and the urlconf (see get_url_context) of the
+        request that started the job.
+        """
+        self.status = RUNNING
+        self.started = time.time()
+        self.save()
+        tmp_path = '%s.tmp' % (self.data_path,)
+        previous = get_url_context()
+        if url_context is not None:
+            set_url_context(url_context)
+        try:
+            with open(tmp_path, 'w') as f:
+                serializers.serialize('rest%s' % (self.format,), data, stream=f, **options)
+            os.rename(tmp_path, self.data_path)
+        except Exception, e:
+            self.status = FAILED
+            self.error = unicode(e)
+        else:
+            self.status = DONE
+        finally:
+            set_url_context(previous)
+        self.save()
+
+def get_url_context():
+    """
+    Returns the thread-local script prefix and urlconf used by reverse().
+    Worker threads don't inherit them from the request.
+    """
+    return (get_script_prefix(), get_urlconf())
+
+def set_url_context(url_context):
+    script_prefix, urlconf = url_context
+    set_script_prefix(script_prefix)
+    set_urlconf(urlconf)
+
+def get_ttl():
+    return getattr(settings, 'RIV_EXPORT_TTL', 86400)
+
+def get_timeout():
+    return getattr(settings, 'RIV_EXPORT_TIMEOUT', 3600)
+
+def get_job(job_id):
+    """
+    Returns the job or None if it doesn't exist or has expired. Stale
+    jobs are marked as failed.
+    """
+    job = ExportJob.load(job_id)
+    if job is None:
+        return None
+    try:
+        changed = os.path.getmtime(job.state_path)
+    except OSError:
+        return None
+    now = time.time()
+    if now - changed > get_ttl():
+        job.delete()
+        return None
+    if job.is_stale(now):
+        job.status = FAILED
+        job.error = u'The export has not been finished in time.'
+        job.save()
+    return job
+
+def cleanup(now=None):
+    """
+    Removes the files of the jobs that haven't changed for
+    RIV_EXPORT_TTL seconds, including files left behind by jobs that
+    have been interrupted.
+    """
+    path = get_export_dir()
+    expires = (now or time.time()) - get_ttl()
+    for name in os.listdir(path):
+        if not JOB_FILE_RE.match(name):
+            continue
+        try:
+            if os.path.getmtime(os.path.join(path, name)) < expires:
+                os.remove(os.path.join(path, name))
+        except OSError:
+            # Removed by another thread or process.
+            pass
+
+def start_export(resource_name, format, data, options):
+    """
+    Creates a job serializing the data with the given options. The
+    job is executed by one of RIV_EXPORT_WORKERS threads. If the
+    setting is 0 the job is executed immediately.
+    """
+    _cleanup_periodically()
+    job = ExportJob(uuid.uuid4().hex, resource_name, format)
+    job.save()
+    workers = getattr(settings, 'RIV_EXPORT_WORKERS', 2)
+    if workers > 0:
+        _get_queue(workers).put((job, data, options, get_url_context()))
+    else:
+        job.run(data, options)
+    return job
+
+def _cleanup_periodically():
+    global _last_cleanup
+    now = time.time()
+    with _queue_lock:
+        if now - _last_cleanup < CLEANUP_INTERVAL:
+            return
+        _last_cleanup = now
+    cleanup(now)
+
+def _get_queue(workers):
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = Queue.Queue()
+            for i in range(workers):
+                thread = threading.Thread(target=_work, args=(_queue,), name='riv-export-%d' % (i,))
+                thread.daemon = True
+                thread.start()
+    return _queue
+
+def _work(queue):
+    while True:
+        job, data, options, url_context = queue.get()
+        try:
+            job.run(data, options, url_context)
+        finally:
+            # Each worker thread has its own database connections.
+            for connection in connections.all():
+                connection.close()
+            queue.task_done()
@@ -31,5 +31,14 @@ class HttpResponseConflict(HttpResponse):
 class HttpResponseUnsupportedMediaType(HttpResponse):
     status_code = 415
 
+class HttpResponseRequestedRangeNotSatisfiable(HttpResponse):
+    status_code = 416
+
+class HttpResponseUnprocessableEntity(HttpResponse):
+    status_code = 422
+
 class HttpResponseNotImplemented(HttpResponse):
     status_code = 501
+
+class HttpResponseServiceUnavailable(HttpResponse):
+    status_code = 503
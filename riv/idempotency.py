@@ -0,0 +1,138 @@
+"""
+Replays the responses of POST requests that are repeated with the same
+``Idempotency-Key`` header. The first response for a key is stored in
+the cache RIV_IDEMPOTENCY_CACHE for RIV_IDEMPOTENCY_TTL seconds. While
+a request is executed, requests with the same key wait for its
+response instead of executing it a second time.
+
+The body of a request is hashed while the loaders read it, so it isn't
+kept in memory.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import get_cache
+from django.http import HttpResponse, HttpResponseBadRequest
+from django.utils.encoding import force_bytes
+from riv.http import HttpResponseConflict, HttpResponseUnprocessableEntity
+
+HEADER = 'HTTP_IDEMPOTENCY_KEY'
+MAX_KEY_LENGTH = 255
+
+# Interval in seconds to check if a concurrent request is done.
+POLL_INTERVAL = 0.05
+
+# Bytes read at once to hash the rest of a body.
+CHUNK_SIZE = 64 * 1024
+
+_caches = {}
+
+def get_idempotency_cache():
+    alias = getattr(settings, 'RIV_IDEMPOTENCY_CACHE', 'default')
+    try:
+        return _caches[alias]
+    except KeyError:
+        cache = _caches[alias] = get_cache(alias)
+        return cache
+
+def get_client_id(request):
+    """
+    Identifies the client of a request by its user, its session or
+    its address (in this order).
+    """
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated():
+        return 'user:%s' % (user.pk,)
+    session = getattr(request, 'session', None)
+    if session is not None and session.session_key:
+        return 'session:%s' % (session.session_key,)
+    return 'addr:%s' % (request.META.get('REMOTE_ADDR', ''),)
+
+def call_once(request, scope, view, *args, **kwargs):
+    """
+    Calls the view unless the request has already been handled with
+    the same key. Requests without a key (or not using POST) are
+    passed to the view.
+    """
+    key = request.META.get(HEADER)
+    if not key or request.method.upper() != 'POST':
+        return view(request, *args, **kwargs)
+    if len(key) > MAX_KEY_LENGTH:
+        return HttpResponseBadRequest()
+
+    cache = get_idempotency_cache()
+    cache_key = 'riv-idempotency:%s' % (_digest(scope, get_client_id(request), key),)
+    lock_key = '%s:lock' % (cache_key,)
+    body = _HashingStream(request)
+
+    deadline = time.time() + getattr(settings, 'RIV_IDEMPOTENCY_WAIT', 10)
+    while True:
+        entry = cache.get(cache_key)
+        if entry is not None:
+            if entry['fingerprint'] != body.get_fingerprint():
+                # The key has been used for another request.
+                return HttpResponseUnprocessableEntity()
+            return _replay(entry)
+        if cache.add(lock_key, True, getattr(settings, 'RIV_IDEMPOTENCY_LOCK_TIMEOUT', 60)):
+            break
+        if time.time() >= deadline:
+            response = HttpResponseConflict()
+            response['Retry-After'] = '1'
+            return response
+        time.sleep(POLL_INTERVAL)
+
+    try:
+        # The view reads the body through the stream.
+        request._stream = body
+        response = view(request, *args, **kwargs)
+        # Server errors are not final. The client may retry them.
+        if response.status_code < 500 and not getattr(response, 'streaming', False):
+            cache.set(cache_key, {
+                'fingerprint': body.get_fingerprint(),
+                'status': response.status_code,
+                'headers': response.items(),
+                'content': response.content,
+            }, getattr(settings, 'RIV_IDEMPOTENCY_TTL', 86400))
+    finally:
+        cache.delete(lock_key)
+    return response
+
+class _HashingStream(object):
+    """
+    Reads the body of a request and computes the fingerprint of the
+    request (method, URL, content type and body) from the data read.
+    """
+    def __init__(self, request):
+        self.stream = request._stream
+        self.md5 = hashlib.md5('\0'.join(force_bytes(part) for part in (
+            request.method.upper(), request.get_full_path(), request.META.get('CONTENT_TYPE', ''), ''
+        )))
+
+    def read(self, *args, **kwargs):
+        data = self.stream.read(*args, **kwargs)
+        self.md5.update(data)
+        return data
+
+    def readline(self, *args, **kwargs):
+        data = self.stream.readline(*args, **kwargs)
+        self.md5.update(data)
+        return data
+
+    def get_fingerprint(self):
+        """
+        Reads the rest of the body in chunks and returns the fingerprint.
+        """
+        while self.read(CHUNK_SIZE):
+            pass
+        return self.md5.hexdigest()
+
+def _digest(*parts):
+    return hashlib.md5('\0'.join(force_bytes(part) for part in parts)).hexdigest()
+
+def _replay(entry):
+    response = HttpResponse(entry['content'], status=entry['status'])
+    for (header, value) in entry['headers']:
+        response[header] = value
+    response['Idempotent-Replayed'] = 'true'
+    return response
@@ -7,6 +7,14 @@ class RestInformation(object):
     Contains additional information about the current request and the
     processing state, that can be useful to the REST handling classes.
     """
+    # A RestInformation object is created for every request. Views may
+    # still add their own attributes. The __dict__ holding them is only
+    # created when the first one is set.
+    __slots__ = (
+        '_resource_meta', '_queryset', '_has_errors', '_error_dict',
+        'request_method', 'request_type', 'format', 'head', 'allowed_methods',
+        '__dict__',
+    )
 
     def __init__(self, meta):
         self._resource_meta = meta
@@ -18,6 +26,8 @@ class RestInformation(object):
         # None, 'object', or 'multiple
         self.request_type = None
         self.format = None
+        # True if the request is handled as GET but was a HEAD request.
+        self.head = False
         # This lists the allowed methods for the given request type (object, multiple, list)
         # This information is required in a RFC compliant "HttpNotAllowed" response.
         self.allowed_methods = []
@@ -53,6 +63,46 @@ class RestInformation(object):
     def model(self):
         return self._resource_meta.model
 
+    @property
+    def max_ids(self):
+        return self._resource_meta.max_ids
+
+    @property
+    def fast_validation(self):
+        return self._resource_meta.fast_validation
+
+    @property
+    def report_item_status(self):
+        return self._resource_meta.report_item_status
+
+    @property
+    def commit_valid_items(self):
+        return self._resource_meta.commit_valid_items
+
+    @property
+    def export_jobs(self):
+        return self._resource_meta.export_jobs
+
+    @property
+    def bulk_creation(self):
+        return self._resource_meta.bulk_creation
+
+    @property
+    def allow_batch_deletion(self):
+        return self._resource_meta.allow_batch_deletion
+
+    @property
+    def bulk_deletion(self):
+        return self._resource_meta.bulk_deletion
+
+    @property
+    def render_object_after_creation(self):
+        return self._resource_meta.render_object_after_creation
+
+    @property
+    def batch_size(self):
+        return self._resource_meta.batch_size
+
     @property
     def include_object_in_response(self):
         return self._resource_meta.include_object_in_response
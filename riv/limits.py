@@ -0,0 +1,92 @@
+"""
+Limits the number of requests a resource (or an Api) handles at the
+same time. Requests exceeding the limit wait in a bounded queue or are
+rejected, so an expensive resource can't occupy all worker threads.
+
+The limits apply to each process.
+"""
+import threading
+import time
+
+from riv.http import HttpResponseServiceUnavailable
+
+class ConcurrencyLimiter(object):
+    """
+    Admits at most ``limit`` concurrent requests. Up to ``queue_size``
+    further requests wait at most ``timeout`` seconds for a slot.
+    """
+    def __init__(self, limit, queue_size=0, timeout=10):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self._condition = threading.Condition()
+        # Counters for monitoring.
+        self.active = 0
+        self.waiting = 0
+        self.peak = 0
+        self.accepted = 0
+        self.queued = 0
+        self.rejected = 0
+
+    def acquire(self):
+        """
+        Returns True if the request may be handled. It has to call
+        release() once it is done.
+        """
+        with self._condition:
+            if self.active >= self.limit:
+                if self.waiting >= self.queue_size:
+                    self.rejected += 1
+                    return False
+                self.waiting += 1
+                self.queued += 1
+                deadline = time.time() + self.timeout
+                try:
+                    while self.active >= self.limit:
+                        remaining = deadline - time.time()
+                        if remaining <= 0:
+                            self.rejected += 1
+                            return False
+                        self._condition.wait(remaining)
+                finally:
+                    self.waiting -= 1
+            self.active += 1
+            self.accepted += 1
+            self.peak = max(self.peak, self.active)
+            return True
+
+    def release(self):
+        with self._condition:
+            self.active -= 1
+            self._condition.notify()
+
+    def get_stats(self):
+        with self._condition:
+            return {
+                'limit': self.limit,
+                'queue_size': self.queue_size,
+                'active': self.active,
+                'waiting': self.waiting,
+                'peak': self.peak,
+                'accepted': self.accepted,
+                'queued': self.queued,
+                'rejected': self.rejected,
+            }
+
+def call_limited(limiters, view, *args, **kwargs):
+    """
+    Calls the view if all limiters admit the request. Otherwise a 503
+    response is returned.
+    """
+    acquired = []
+    try:
+        for limiter in limiters:
+            if not limiter.acquire():
+                response = HttpResponseServiceUnavailable()
+                response['Retry-After'] = '1'
+                return response
+            acquired.append(limiter)
+        return view(*args, **kwargs)
+    finally:
+        for limiter in acquired:
+            limiter.release()
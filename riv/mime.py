@@ -1,3 +1,7 @@
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
 from django.core import serializers
 
 formats = {
@@ -9,6 +13,16 @@ formats = {
     'application/x-yaml': 'yaml',
 }
 
+# The registered REST serializers and the state of Django's serializer
+# registry they have been computed for.
+_rest_serializers = None
+_serializers_state = None
+
+# Maps (Accept header, format parameter, Content-Type) to the negotiated
+# format. The least recently used entries are dropped first.
+_format_cache = OrderedDict()
+_format_cache_lock = threading.Lock()
+
 def get_mime_for_format(format):
     for k,v in formats.items():
         if v == format:
@@ -18,7 +32,41 @@ def get_available_format(request):
     """
     Trys to determine the requestes format from the current request and returns it
     if a suitable serializer for the found format is available.
+
+    Only a few different Accept headers are used by the clients. Thus, the
+    result is cached.
+    """
+    # Refreshes the cache if serializers have been registered.
+    get_serializers()
+
+    key = (
+        request.META.get('HTTP_ACCEPT', '*/*'),
+        request.GET.get('format', None),
+        request.META.get('CONTENT_TYPE', ''),
+    )
+    with _format_cache_lock:
+        if key in _format_cache:
+            format = _format_cache.pop(key)
+            _format_cache[key] = format
+            return format
+
+    format = _negotiate_format(request)
+
+    with _format_cache_lock:
+        _format_cache[key] = format
+        while len(_format_cache) > getattr(settings, 'RIV_FORMAT_CACHE_SIZE', 128):
+            _format_cache.popitem(last=False)
+    return format
+
+def clear_format_cache():
     """
+    Drops all negotiated formats. Call this method if you replaced a
+    serializer in Django's registry.
+    """
+    with _format_cache_lock:
+        _format_cache.clear()
+
+def _negotiate_format(request):
     # Get a list of registered REST serializers
     serializers = get_serializers()
 
@@ -81,7 +129,21 @@ def detect_format(request):
 
 
 def get_serializers():
-    return [s for s in serializers.get_serializer_formats() if s.startswith('rest')]
+    """
+    Returns the list of registered REST serializers. The list is only
+    computed again if serializers have been registered or unregistered.
+    """
+    global _rest_serializers, _serializers_state
+    if _get_serializers_state() != _serializers_state:
+        _rest_serializers = [s for s in serializers.get_serializer_formats() if s.startswith('rest')]
+        _serializers_state = _get_serializers_state()
+        clear_format_cache()
+    return _rest_serializers
+
+def _get_serializers_state():
+    # Django replaces the registry on (re)loading and adds or removes
+    # single entries on (un)registering serializers.
+    return (id(serializers._serializers), len(serializers._serializers))
 
 
 def media_by_accept_header(request):
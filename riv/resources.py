@@ -1,17 +1,34 @@
 import django
 from django.core.exceptions import ValidationError
+import hashlib
+import os
+import re
+from wsgiref.util import FileWrapper
+
 from django.http import Http404, HttpResponse, HttpResponseBadRequest, HttpResponseServerError, HttpResponseNotFound
+try:
+    from django.http import StreamingHttpResponse
+except ImportError:
+    # Django < 1.5
+    StreamingHttpResponse = HttpResponse
 from django.conf import settings
 from django.conf.urls import patterns, url
+from django.core.urlresolvers import reverse
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
 from django.views.decorators.csrf import csrf_exempt
+from django.db import connections, router
+from django.db.models import AutoField, Model
 from django.db.models.query import QuerySet
 from django.core import serializers
 
-from riv import RestResponse
+from riv import RestResponse, caching, exports, idempotency, limits
+from riv.api import get_api
 from riv.exceptions import ConfigurationError, UnsupportedFormat
 from riv.http import HttpResponseNotAllowed, HttpResponseNoContent, HttpResponseCreated, HttpResponseNotImplemented, \
-        HttpResponseNotAcceptable, HttpResponseUnsupportedMediaType
+        HttpResponseNotAcceptable, HttpResponseUnsupportedMediaType, HttpResponseRequestedRangeNotSatisfiable
 from riv.info import RestInformation
+from riv.serializers.base_serializer import LoadingError
 from riv.wrappers import BaseWrapper
 from riv.mime import formats, get_available_format, get_mime_for_format
 from riv.utils import get_url_for_object
@@ -58,7 +75,21 @@ ALLOWED_OPTIONS = (
     'reverse',
     'allowed_methods',
     'allow_batch_creation',
+    'bulk_creation',
+    'batch_size',
+    'max_ids',
     'allow_batch_deletion',
+    'bulk_deletion',
+    'export_jobs',
+    'export_threshold',
+    'fast_validation',
+    'report_item_status',
+    'commit_valid_items',
+    'idempotency_keys',
+    'max_concurrent_requests',
+    'max_queued_requests',
+    'queue_timeout',
+    'cache',
     'render_object_after_creation',
     'redirect_as_error',
     'redirect_as_error_code',
@@ -72,10 +103,25 @@ ALLOWED_OPTIONS = (
     'map_fields'
 )
 
+# Range header of a GET request on a list, e.g. "items=0-24".
+ITEM_RANGE_RE = re.compile(r'^items=(\d+)-(\d*)$')
+
+# The request types and methods the lookup tables of ResourceOptions
+# are computed for.
+REQUEST_TYPES = ('object', 'multiple', 'list')
+REQUEST_METHODS = ('GET', 'POST', 'PUT', 'DELETE')
+
 class ResourceOptions(object):
     """
     Contains defaults for all options.
     """
+    __slots__ = ALLOWED_OPTIONS + (
+        '_allowed_requests',
+        '_allowed_methods_by_type',
+        '_fields_by_method',
+        '_exclude_by_method',
+    )
+
     def __init__(self, meta):
         self.name = None
         self.model = None
@@ -85,8 +131,44 @@ class ResourceOptions(object):
         self.allowed_methods = ['GET', 'POST', 'PUT', 'DELETE']
         # Allow to supply multiple entities on a POST request
         self.allow_batch_creation = False
+        # Save batch POSTs using bulk inserts (StandaloneWrapper only).
+        self.bulk_creation = False
+        # Number of objects written by a single bulk query. Bulk
+        # inserts and the updates of PUT requests on multiple objects
+        # bypass save(), its signals and auto_now fields.
+        self.batch_size = 500
+        # Maximum number of ids in the URI of multiple objects.
+        self.max_ids = 1000
         # Allow to delete all objects
         self.allow_batch_deletion = False
+        # Delete multiple objects using plain DELETE queries without
+        # loading them (StandaloneWrapper only).
+        self.bulk_deletion = False
+        # Serialize GET requests on the list in a background job.
+        self.export_jobs = False
+        # Lists with fewer objects are returned without a job.
+        self.export_threshold = 1000
+        # Validate write requests with compiled validators instead of
+        # ModelForms (StandaloneWrapper only).
+        self.fast_validation = False
+        # Return the status of each entity of a batch POST instead of
+        # failing the whole request (StandaloneWrapper only).
+        self.report_item_status = False
+        # Save the valid entities even if other entities of the batch
+        # are invalid. Requires report_item_status.
+        self.commit_valid_items = False
+        # Replay the response of POST requests repeated with the same
+        # Idempotency-Key header.
+        self.idempotency_keys = False
+        # Maximum number of requests handled at the same time by each
+        # process. Further requests wait in a queue of the given size
+        # for at most queue_timeout seconds or get a 503 response.
+        self.max_concurrent_requests = None
+        self.max_queued_requests = 0
+        self.queue_timeout = 10
+        # Cache the responses of GET requests. Either True or a dict with
+        # the keys 'timeout', 'alias' and 'vary' (StandaloneWrapper only).
+        self.cache = None
         self.render_object_after_creation = False
         # Treat it as an error using the code if a view returns with a redirect.
         self.redirect_as_error = False
@@ -114,10 +196,76 @@ class ResourceOptions(object):
 
         # apply overridden fields from 'class Meta'.
         self.apply_overrides(meta)
+        self._check_options()
 
         if self.name is None and getattr(self, 'model', None):
             self.name = getattr(self, 'model', None)._meta.verbose_name
 
+        self._build_lookup_tables()
+
+    def _check_options(self):
+        """
+        Rejects combinations of options that can't be honored.
+        """
+        if self.bulk_creation and self.model and isinstance(self.model._meta.pk, AutoField):
+            # bulk_create doesn't return auto-generated primary keys.
+            if self.render_object_after_creation or self.report_item_status:
+                raise ConfigurationError('bulk_creation can\'t be combined with render_object_after_creation or report_item_status for models with auto-generated primary keys')
+            if self.model._meta.many_to_many:
+                raise ConfigurationError('bulk_creation is not supported for models with auto-generated primary keys and many-to-many fields')
+
+    def _build_lookup_tables(self):
+        """
+        Precomputes the allowed methods for each request type and the
+        fields and exclude lists for each request method.
+        """
+        self._allowed_requests = set()
+        for entry in self.allowed_methods:
+            parts = entry.split('_')
+            if len(parts) == 1:
+                self._allowed_requests.update((entry, req_type) for req_type in REQUEST_TYPES)
+            else:
+                self._allowed_requests.add((parts[0], parts[1]))
+        self._allowed_methods_by_type = dict(
+            (req_type, list(set(m for (m, t) in self._allowed_requests if t == req_type)))
+            for req_type in REQUEST_TYPES
+        )
+        self._fields_by_method = dict((m, self._optionlist_for_method(m, self.fields)) for m in REQUEST_METHODS)
+        self._exclude_by_method = dict((m, self._optionlist_for_method(m, self.exclude)) for m in REQUEST_METHODS)
+
+    def allowed_methods_for(self, req_type):
+        """
+        Returns the list of methods allowed for the request type.
+        """
+        return self._allowed_methods_by_type.get(req_type, [])
+
+    def is_allowed(self, method, req_type):
+        return (method, req_type) in self._allowed_requests
+
+    def fields_for(self, method):
+        try:
+            return self._fields_by_method[method]
+        except KeyError:
+            return self._optionlist_for_method(method, self.fields)
+
+    def exclude_for(self, method):
+        try:
+            return self._exclude_by_method[method]
+        except KeyError:
+            return self._optionlist_for_method(method, self.exclude)
+
+    def _optionlist_for_method(self, method, optlist):
+        """
+        Entries of the fields and exclude options can be restricted to
+        request methods using a dictionary: {'field': ['GET', 'PUT']}
+        """
+        x = lambda e, t: isinstance(e, dict) and not t in e.values()[0]
+        obj_or_key = lambda e: isinstance(e, dict) and e.keys()[0] or e
+        if isinstance(optlist, list):
+            return [obj_or_key(i) for i in optlist if not x(i, method)]
+        else:
+            return optlist
+
     def apply_overrides(self, meta):
         meta_dict = getattr(meta, '__dict__', None)
         if meta_dict:
@@ -140,6 +288,10 @@ class ResourceMeta(type):
 
         new_class._meta = ResourceOptions(meta)
 
+        # Resolve the handlers of the wrapper to surface configuration
+        # errors early.
+        new_class._wrapper.get_handlers()
+
         return new_class
 
 class Resource(object):
@@ -163,6 +315,16 @@ class Resource(object):
         if name:
             self._meta.name = name
         self.display_errors = getattr(settings, 'RIV_DISPLAY_ERRORS', display_errors)
+        self.limiter = None
+        if self._meta.max_concurrent_requests:
+            self.limiter = limits.ConcurrencyLimiter(
+                self._meta.max_concurrent_requests,
+                self._meta.max_queued_requests,
+                self._meta.queue_timeout
+            )
+        self.response_cache = None
+        if self._meta.cache:
+            self.response_cache = caching.ResponseCache(self._meta)
 
     # URL names have the form: (list|object|multiple)-<api_name>-(<model_name>|<resource_name>)
     # When we try to reverse-resolve the URLs for a related object we only know the name of the 
@@ -187,16 +349,65 @@ class Resource(object):
     urls = property(_get_urls)
     urls_with_reverse = property(_get_urls_reverse)
 
+    def get_concurrency_stats(self):
+        """
+        Returns the counters of the concurrency limit or None.
+        """
+        if self.limiter is None:
+            return None
+        return self.limiter.get_stats()
+
     @csrf_exempt
     def handle_request(self, request, *args, **kwargs):
+        method = request.method.upper()
+        if self.response_cache is not None and method in ('GET', 'HEAD') and 'HTTP_RANGE' not in request.META:
+            return self._call_cached(request, *args, **kwargs)
+        response = self._call_limited(request, *args, **kwargs)
+        if method not in ('GET', 'HEAD') and self._meta.model and response.status_code < 400:
+            # Bulk queries don't send signals.
+            caching.invalidate(self._meta.model)
+        return response
+
+    def _call_cached(self, request, *args, **kwargs):
+        # Cached responses are returned without passing the limits.
+        head = request.method.upper() == 'HEAD'
+        key = self.response_cache.get_key(request, get_available_format(request))
+        if key is not None:
+            response = self.response_cache.get(key, head=head)
+            if response is not None:
+                return response
+        response = self._call_limited(request, *args, **kwargs)
+        if key is not None and not head and response.status_code == 200 and not getattr(response, 'streaming', False):
+            self.response_cache.set(key, response)
+        return response
+
+    def _call_limited(self, request, *args, **kwargs):
+        api = get_api(self._meta.api_name)
+        limiters = [limiter for limiter in (self.limiter, api and api.limiter) if limiter is not None]
+        if limiters:
+            return limits.call_limited(limiters, self._call_once, request, *args, **kwargs)
+        return self._call_once(request, *args, **kwargs)
+
+    def _call_once(self, request, *args, **kwargs):
+        if self._meta.idempotency_keys:
+            # The keys of a client are shared by all resources of an Api.
+            return idempotency.call_once(request, self._meta.api_name or '', self._handle_request, *args, **kwargs)
+        return self._handle_request(request, *args, **kwargs)
+
+    def _handle_request(self, request, *args, **kwargs):
         rest_info = RestInformation(self._meta)
 
         req_meth = request.method.upper()
+        if req_meth == 'HEAD':
+            # A HEAD request is handled like a GET request. Only the
+            # serialization of the response body is skipped.
+            req_meth = request.method = 'GET'
+            rest_info.head = True
         req_type = self._get_request_type(req_meth, kwargs)
 
         rest_info.request_method  = req_meth
         rest_info.request_type    = req_type
-        rest_info.allowed_methods = self._http_allowed_methods(req_type)
+        rest_info.allowed_methods = self._meta.allowed_methods_for(req_type)
         rest_info.format          = get_available_format(request)
 
         if not rest_info.format:
@@ -206,7 +417,7 @@ class Resource(object):
             else:
                 return HttpResponseNotAcceptable()
 
-        if not self._check_method(req_meth, req_type):
+        if not self._meta.is_allowed(req_meth, req_type):
             return HttpResponseNotAllowed(allow_headers=rest_info.allowed_methods)
 
         # Add an is_rest() method to the request (returning True)
@@ -261,6 +472,39 @@ class Resource(object):
         )
 
 
+    @csrf_exempt
+    def handle_export(self, request, job_id):
+        """
+        Returns the state of an export job or the exported file once
+        the job is done. A DELETE request removes the job.
+        """
+        if not self._meta.export_jobs:
+            return HttpResponseNotFound()
+        job = exports.get_job(job_id)
+        if job is None or job.resource_name != self._meta.name:
+            return HttpResponseNotFound()
+
+        req_meth = request.method.upper()
+        if req_meth == 'DELETE':
+            job.delete()
+            return HttpResponseNoContent()
+        elif req_meth != 'GET':
+            return HttpResponseNotAllowed(allow_headers=['GET', 'DELETE'])
+
+        if job.status == exports.DONE:
+            response = StreamingHttpResponse(FileWrapper(open(job.data_path, 'rb')), content_type=get_mime_for_format(job.format))
+            response['Content-Length'] = os.path.getsize(job.data_path)
+            return response
+        elif job.status == exports.FAILED:
+            return HttpResponseServerError()
+        return self._export_status_response(job)
+
+    def _export_status_response(self, job):
+        response = HttpResponse(status=202, content_type=get_mime_for_format(job.format))
+        response['Location'] = reverse('export-%s' % (self._meta.api_name,), kwargs={'name': self._meta.name, 'job_id': job.job_id})
+        response.content = serializers.serialize('rest%s' % (job.format,), {'status': job.status}, render_only=True)
+        return response
+
     def pre_view(self, request):
         pass
 
@@ -277,14 +521,25 @@ class Resource(object):
         from django.http.request import QueryDict, MultiValueDict
         if not request.method in ['POST', 'PUT']:
             request._post, request._files = QueryDict('', encoding=request._encoding), MultiValueDict()
+            request.rest_data = None
         else:
             # TODO multipart (files) not supported.
             q = QueryDict('', encoding=request._encoding).copy()
-            d = self._raw_data_to_dict(request)
-            for key in d.keys():
-                if isinstance(d[key], list):
-                    q.setlist(key, d.pop(key))
-            q.update(d)
+            force_batch = request.rest_info.request_type == 'list' and self._meta.allow_batch_creation
+            # Wrappers that don't need formset-like POST variables get the
+            # objects of a batch one at a time while the body is parsed.
+            # Otherwise the list of objects is available to all handlers.
+            stream = not self._wrapper.batch_data_as_formset and \
+                (force_batch or request.rest_info.request_type == 'multiple')
+            loader = self._load_raw_data(request, stream=stream)
+            request.rest_data = loader.get_objects()
+            if not stream and (self._wrapper.batch_data_as_formset or not (force_batch or len(request.rest_data) > 1)):
+                # A single object is shared with rest_data. Thus, copy it.
+                d = dict(loader.get_querydict(force_batch=force_batch))
+                for key in d.keys():
+                    if isinstance(d[key], list):
+                        q.setlist(key, d.pop(key))
+                q.update(d)
             request.method = 'POST'
             request._post = q
             request._files = MultiValueDict()
@@ -323,6 +578,9 @@ class Resource(object):
         if exception:
             if settings.DEBUG and self.display_errors:
                 raise
+            elif isinstance(exception, LoadingError):
+                # Malformed input found while the handler read a batch.
+                return HttpResponseBadRequest()
             else:
                 return HttpResponseServerError()
 
@@ -346,7 +604,9 @@ class Resource(object):
 
         if request.rest_info.request_method == 'DELETE':
                 if response.status_code == 200 and not self._meta.render_object_after_creation:
-                    return HttpResponseNoContent()
+                    # Keep the headers of the response (e.g. X-Deleted-Count).
+                    response.status_code = 204
+                    response.content = ''
         elif request.rest_info.request_method in ['POST', 'PUT']:
                 if response.status_code == 200:
                     if response.content == '':
@@ -381,10 +641,7 @@ class Resource(object):
 
         return response
 
-    def _http_allowed_methods(self, req_type):
-        return list(set(i.split('_')[0] for i in self._meta.allowed_methods if len(i.split('_')) == 1 or i.split('_')[1] == req_type))
-
-    def _raw_data_to_dict(self, request):
+    def _load_raw_data(self, request, stream=False):
         try:
             format = formats[request.META.get('CONTENT_TYPE', 'application/json')]
         except KeyError:
@@ -400,39 +657,24 @@ class Resource(object):
             else:
                 return HttpResponseUnsupportedMediaType()
         if django.VERSION[0] == 1 and django.VERSION[1] >= 4:
-            data = request.body
+            # The request is file-like. Loaders read from the stream
+            # instead of copying the whole body.
+            data = request
         else:
             data = request.raw_post_data
         loader = Loader()
-        loader.load(data,
+        options = dict(
                 map_fields=self._meta.map_fields,
                 model=self._meta.model,
-                fields=self._optionlist_for_type(request.rest_info.request_method, self._meta.fields),
-                exclude=self._optionlist_for_type(request.rest_info.request_method, self._meta.exclude)
+                fields=self._meta.fields_for(request.rest_info.request_method),
+                exclude=self._meta.exclude_for(request.rest_info.request_method)
         )
-        if request.rest_info.request_type == 'list':
-            return loader.get_querydict(force_batch=self._meta.allow_batch_creation)
-        else:
-            return loader.get_querydict()
-
-    # TODO this is a helper. should it be here?
-    def _optionlist_for_type(self, method, optlist):
-        x = lambda e, t: isinstance(e, dict) and not t in e.values()[0]
-        obj_or_key = lambda e: isinstance(e, dict) and e.keys()[0] or e
-        if isinstance(optlist, list):
-            return [obj_or_key(i) for i in optlist if not x(i, method)]
+        if stream:
+            # Nothing is read until the handler consumes the objects.
+            loader.objects = loader.iterload(data, **options)
         else:
-            return optlist
-
-    def _check_method(self, method, req_type):
-        """
-        Checks if the request method is allowed.
-        """
-        full_req_type = "%s_%s" % (method, req_type)
-        return (
-            full_req_type in self._meta.allowed_methods or \
-            method in self._meta.allowed_methods
-        )
+            loader.load(data, **options)
+        return loader
 
     def _get_request_type(self, method, kwargs):
         req_type = None
@@ -457,12 +699,18 @@ class Resource(object):
 
         response = HttpResponse(content_type=get_mime_for_format(format))
 
+        if restresponse.items is not None:
+            return self._item_status_response(response, format, restresponse.items)
+
+        data = None
+        render_only = True
         if restresponse.form and restresponse.form.errors:
             data = {'error': restresponse.form.errors}
             response.status_code = 400
             render_only = True
 
-        if restresponse.content:
+        # The truth value of a QuerySet would fetch all of its rows.
+        if isinstance(restresponse.content, QuerySet) or restresponse.content:
             data = restresponse.content
             render_only = not (self._meta.model or False)
             if self._meta.model:
@@ -494,19 +742,74 @@ class Resource(object):
                         response.content = ''
                         return response
 
+        options = dict(
+            related_as_ids=self._meta.related_as_ids, 
+            api_name=self._meta.api_name, 
+            fields=self._meta.fields_for(request.rest_info.request_method),
+            exclude=self._meta.exclude_for(request.rest_info.request_method),
+            reverse_fields=self._meta.reverse_fields, 
+            inline=self._meta.inline, 
+            map_fields=self._meta.map_fields, 
+            extra=self._meta.extra_fields,
+            render_only=render_only
+        )
+
+        item_range = None
+        if request.rest_info.request_method == 'GET' and request.rest_info.request_type == 'list' and \
+        response.status_code == 200 and isinstance(data, (QuerySet, list)):
+            response['Accept-Ranges'] = 'items'
+            item_range = self._get_item_range(request)
+            if item_range:
+                data, total = self._slice_items(data, *item_range)
+                if not data and item_range[0] > 0:
+                    response = HttpResponseRequestedRangeNotSatisfiable()
+                    response['Content-Range'] = 'items */%d' % (total,)
+                    return response
+                elif not data:
+                    # An empty list is returned completely.
+                    response['Content-Range'] = 'items */0'
+                else:
+                    response.status_code = 206
+                    response['Content-Range'] = 'items %d-%d/%d' % (item_range[0], item_range[0] + len(data) - 1, total)
+                    response['Content-Location'] = request.path
+                    response['Date'] = http_date()
+                    patch_vary_headers(response, ('Accept', 'Range'))
+
+        if request.rest_info.head and response.status_code in (200, 206):
+            return self._head_response(response, format, data)
+
+        if self._meta.export_jobs and response.status_code == 200 and not item_range and \
+        request.rest_info.request_method == 'GET' and request.rest_info.request_type == 'list' and \
+        self._needs_export(data):
+            job = exports.start_export(self._meta.name, format, data, options)
+            return self._export_status_response(job)
+
+        s = self._serialize(format, data, options)
+        if isinstance(s, HttpResponse):
+            return s
+        response.content = s
+        if request.rest_info.request_method == 'GET' and response.status_code in (200, 206):
+            response['ETag'] = self._get_etag(format, data)[0]
+        return response
+
+    def _needs_export(self, data):
+        """
+        Returns True if the list has at least export_threshold objects.
+        At most that many rows are counted.
+        """
+        threshold = self._meta.export_threshold
+        if not threshold:
+            return True
+        if isinstance(data, QuerySet):
+            return data[:threshold].count() >= threshold
+        return isinstance(data, list) and len(data) >= threshold
+
+    def _serialize(self, format, data, options):
+        """
+        Returns the serialized data or an error response.
+        """
         try:
-            s = serializers.serialize('rest%s' % (format), 
-                data, 
-                related_as_ids=self._meta.related_as_ids, 
-                api_name=self._meta.api_name, 
-                fields=self._optionlist_for_type(request.rest_info.request_method, self._meta.fields),
-                exclude=self._optionlist_for_type(request.rest_info.request_method, self._meta.exclude),
-                reverse_fields=self._meta.reverse_fields, 
-                inline=self._meta.inline, 
-                map_fields=self._meta.map_fields, 
-                extra=self._meta.extra_fields,
-                render_only=render_only
-            )
+            return serializers.serialize('rest%s' % (format), data, **options)
         except serializers.base.SerializerDoesNotExist:
             if settings.DEBUG and self.display_errors:
                 raise UnsupportedFormat('Format %s is not supported. Check if you included the serializers in the settings file.' % (format,))
@@ -517,6 +820,134 @@ class Resource(object):
                 raise
             else:
                 return HttpResponseServerError()
-        response.content = s
+
+    def _item_status_response(self, response, format, items):
+        """
+        Renders the status of each entity of a batch request. Created
+        objects are referenced by their URL.
+        """
+        results = []
+        for item in items:
+            result = {'status': item['status']}
+            if 'object' in item:
+                result['location'] = get_url_for_object(self._meta.api_name, item['object'])
+            if 'error' in item:
+                result['error'] = item['error']
+            results.append(result)
+        response.status_code = 207
+        response.content = serializers.serialize('rest%s' % (format,), {'items': results}, render_only=True)
+        return response
+
+    def _get_item_range(self, request):
+        """
+        Returns the first and last index (None for an open end) of a
+        "Range: items=<first>-<last>" header. Invalid ranges are ignored.
+        """
+        match = ITEM_RANGE_RE.match(request.META.get('HTTP_RANGE', '').strip())
+        if not match:
+            return None
+        first = int(match.group(1))
+        last = None
+        if match.group(2):
+            last = int(match.group(2))
+        if last is not None and last < first:
+            return None
+        return first, last
+
+    def _slice_items(self, data, first, last):
+        """
+        Returns the requested items and the total number of items.
+        """
+        stop = None
+        if last is not None:
+            stop = last + 1
+        # A QuerySet is sliced in the database.
+        items = list(data[first:stop])
+        if (stop is None or len(items) < stop - first) and (items or first == 0):
+            # The range reaches the end of the list. Thus, the total
+            # number of items is known without counting.
+            return items, first + len(items)
+        return items, self._count_items(data)
+
+    def _count_items(self, data):
+        if isinstance(data, QuerySet):
+            return data.count()
+        return len(data)
+
+    def _head_response(self, response, format, data):
+        """
+        Sets the headers of a response to a HEAD request without
+        serializing the data. The Content-Length of the GET response is
+        only known if it has been cached (see ResponseCache.get).
+        """
+        response['ETag'], count = self._get_etag(format, data)
+        if count is not None:
+            response['X-Item-Count'] = count
         return response
 
+    def _get_etag(self, format, data):
+        """
+        Returns the ETag of the representation of the data and the
+        number of objects (or None). It is computed from the values of
+        the objects and the primary keys of their many-to-many and
+        reverse relations, which needs one query per relation instead
+        of serializing the objects. The contents of inline objects and
+        extra fields are only covered by the generation counters of
+        cached resources.
+        """
+        md5 = hashlib.md5(format)
+        if self.response_cache is not None:
+            md5.update(repr(self.response_cache.get_generations()))
+        count = None
+        if isinstance(data, Model):
+            data = [data]
+            count = 1
+        if isinstance(data, QuerySet) or (isinstance(data, list) and all(isinstance(obj, Model) for obj in data)):
+            rows = _get_rows(data, self._meta.reverse_fields or [])
+            for row in rows:
+                md5.update(repr(row))
+            if count is None:
+                count = len(rows[0])
+        else:
+            md5.update(repr(data))
+        return '"%s"' % (md5.hexdigest(),), count
+
+
+def _get_rows(data, reverse_fields):
+    """
+    Returns the concrete field values of the objects followed by the
+    ordered (object, related object) primary keys of each many-to-many
+    and reverse relation.
+    """
+    if isinstance(data, QuerySet):
+        model = data.model
+        names = [field.attname for field in model._meta.concrete_fields]
+        values = list(data.values_list(*names))
+        pks = [row[names.index(model._meta.pk.attname)] for row in values]
+        # The relations are looked up with a subquery.
+        lookups = [data.values('pk')]
+    elif data:
+        model = data[0]._meta.concrete_model
+        values = [tuple(getattr(obj, field.attname) for field in model._meta.concrete_fields) for obj in data]
+        pks = [obj.pk for obj in data]
+        # Stay below the parameter limit of the database.
+        chunk_size = max(connections[router.db_for_read(model)].ops.bulk_batch_size(['pk'], pks), 1)
+        lookups = [pks[i:i+chunk_size] for i in range(0, len(pks), chunk_size)]
+    else:
+        return [[]]
+    rows = [values]
+    if not pks:
+        return rows
+    relations = [(field.rel.through, field.m2m_field_name(), field.m2m_reverse_field_name()) for field in model._meta.many_to_many]
+    for related in model._meta.get_all_related_objects():
+        if related.get_accessor_name() in reverse_fields:
+            relations.append((related.model, related.field.name, 'pk'))
+    for related in model._meta.get_all_related_many_to_many_objects():
+        if related.get_accessor_name() in reverse_fields:
+            relations.append((related.field.rel.through, related.field.m2m_reverse_field_name(), related.field.m2m_field_name()))
+    for (relation_model, source, target) in relations:
+        manager = relation_model._default_manager
+        rows.append([])
+        for lookup in lookups:
+            rows[-1].extend(manager.filter(**{'%s__in' % (source,): lookup}).order_by(source, target).values_list(source, target))
+    return rows
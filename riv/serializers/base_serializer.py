@@ -4,10 +4,9 @@ from StringIO import StringIO
 from django.db.models import Model
 from django.core.serializers import python, json
 from django.core.serializers.base import SerializationError
-from django.core.urlresolvers import reverse, NoReverseMatch
 from django.utils.encoding import smart_unicode, is_protected_type
 
-from riv.utils import traverse_dict, create_tree_with_val, get_url_for_object
+from riv.utils import traverse_dict, create_tree_with_val, get_url_for_object, get_url_for_pk
 
 SEPARATOR = '__'
 
@@ -37,6 +36,10 @@ class Serializer(python.Serializer):
         self.reverse_fields = options.pop('reverse_fields', [])
         self.render_only = options.pop('render_only', False)
 
+        # Computed once instead of for each serialized object.
+        self._excluded_inline = list(set(self.excluded_fields or []) & set(self.inline or []))
+        self._subfield_options = {}
+
         # If inline is True, each ForeignKey and ManyToMany field is 
         # serialized using a new Serializer. 
         # Reverse relationships include a ForeignKey/M2M back to the current
@@ -67,7 +70,7 @@ class Serializer(python.Serializer):
 
         self.start_serialization()
         # this is a dirty hack
-        self.objects = [{'fields': queryset}]
+        self.objects = [queryset]
         self.end_serialization()
         return self.getvalue()
 
@@ -109,18 +112,24 @@ class Serializer(python.Serializer):
                 self._map_field(key, value)
         # Fields that are present in "excluded" AND "inline" have been serialized because they 
         # might have been required to map fields.  We have to remove them now.
-        if self.excluded_fields and self.inline:
-            for field in (list(set(self.excluded_fields) & set(self.inline))):
+        if self._excluded_inline:
+            for field in self._excluded_inline:
                 try:
                     del self._current[field]
                 except KeyError:
                     pass
-        super(Serializer, self).end_object(obj)
+        self.write_object(self._current)
+        self._current = None
+
+    def write_object(self, data):
+        """
+        Called with the fields of each serialized object. Serializers
+        writing the objects to the stream right away override this.
+        """
+        self.objects.append(data)
 
     def end_serialization(self):
         super(Serializer, self).end_serialization()
-        self.objects = [i['fields'] for i in self.objects]
-
         if self.single_object:
             self.objects = self.objects[0]
 
@@ -165,15 +174,10 @@ class Serializer(python.Serializer):
         else:
             super(Serializer, self).handle_m2m_field(obj, field)
             if not self.related_as_ids:
-                related = getattr(obj, field.name)
-                view_name = 'object-%s-%s' % (self.api_name, related.model._meta)
-                for pos,val in enumerate(self._current[field.name]):
-                    try:
-                        self._current[field.name][pos] = reverse(view_name, kwargs={'id': val})
-                    except NoReverseMatch:
-                        # this indicates that no resource has been registered for this model. So 
-                        # we just return the primary key of the object.
-                        pass
+                # If no resource has been registered for this model the
+                # primary keys are returned.
+                model = field.rel.to
+                self._current[field.name] = [get_url_for_pk(self.api_name, model, val) for val in self._current[field.name]]
 
     def serialize_reverse_fields(self, obj):
         if not self.reverse_fields:
@@ -221,6 +225,14 @@ class Serializer(python.Serializer):
                         self._current[fieldname] = [rev(related) for related in getattr(obj, fieldname).iterator()]
 
     def _get_serialize_options_for_subfield(self, name):
+        # The options are the same for all objects.
+        try:
+            return self._subfield_options[name]
+        except KeyError:
+            options = self._subfield_options[name] = self._compute_serialize_options_for_subfield(name)
+            return options
+
+    def _compute_serialize_options_for_subfield(self, name):
             fields, exclude, maps, inline = None, None, {}, None
             field_option_name = name + SEPARATOR
             if self.selected_fields:
@@ -308,10 +320,7 @@ class Loader:
     internal_use_only = False
 
     def load(self, queryset, **options):
-        self.selected_fields = options.pop('fields', None)
-        self.excluded_fields = options.pop('exclude', [])
-        self.map_fields = options.pop('map_fields', None) # "map" is reserved!
-        self.model = options.pop('model', None)
+        self._set_options(options)
         # data will contain the raw material as it was given to the
         # load method. objects will contain the deserialized data
         # as python list and dictionaries.
@@ -327,6 +336,36 @@ class Loader:
         self.reverse_map_fields()
         self.post_loading()
 
+    def iterload(self, queryset, **options):
+        """
+        Yields the loaded objects one at a time. Excluded fields are
+        removed and mapped fields are reverted for each object.
+        """
+        self._set_options(options)
+        self.data = queryset
+        for obj in self.iter_objects():
+            self.remove_excluded_fields([obj,])
+            self.reverse_map_fields([obj,])
+            yield obj
+
+    def iter_objects(self):
+        """
+        Yields the deserialized objects. Loaders able to parse their
+        input incrementally should override this method.
+        """
+        self.objects = self.data
+        self.pre_loading()
+        if not isinstance(self.objects, list):
+            self.objects = [self.objects,]
+        for obj in self.objects:
+            yield obj
+
+    def _set_options(self, options):
+        self.selected_fields = options.pop('fields', None)
+        self.excluded_fields = options.pop('exclude', [])
+        self.map_fields = options.pop('map_fields', None) # "map" is reserved!
+        self.model = options.pop('model', None)
+
     def pre_loading(self):
         pass
 
@@ -351,8 +390,10 @@ class Loader:
         d.update({'form-TOTAL_FORMS': unicode(counter+1), 'form-INITIAL_FORMS': u'0', 'form-MAX_NUM_FORMS': u''})
         self.objects = d
 
-    def remove_excluded_fields(self):
-        for object in self.objects:
+    def remove_excluded_fields(self, objects=None):
+        if not objects:
+            objects = self.objects
+        for object in objects:
             for field in object.keys():
                 if self.selected_fields and not field in self.selected_fields:
                     del object[field]
@@ -1,5 +1,6 @@
 from StringIO import StringIO
 import json
+from json.decoder import WHITESPACE
 from django.core.serializers.json import DjangoJSONEncoder, DateTimeAwareJSONEncoder
 from django.core.serializers.base import DeserializationError
 
@@ -15,7 +16,26 @@ class Serializer(base.Serializer):
         self.finalize = options.pop('finalize', True)
         return super(Serializer, self).serialize(queryset, **options)
 
+    def start_serialization(self):
+        super(Serializer, self).start_serialization()
+        # Objects are written as soon as they have been serialized.
+        # Indented output is left to json.dump.
+        self.streaming = self.finalize and not self.render_only and not 'indent' in self.options
+        if self.streaming and not self.single_object:
+            self.stream.write('[')
+
+    def write_object(self, data):
+        if not self.streaming:
+            return super(Serializer, self).write_object(data)
+        if not self.first:
+            self.stream.write(', ')
+        json.dump(data, self.stream, cls=DjangoJSONEncoder, **self.options)
+
     def end_serialization(self):
+        if self.streaming:
+            if not self.single_object:
+                self.stream.write(']')
+            return
         super(Serializer, self).end_serialization()
         if not self.finalize:
             return
@@ -26,17 +46,97 @@ class Serializer(base.Serializer):
             return self.stream.getvalue()
 
 class Loader(base.Loader):
+    # Number of bytes read from the stream at once.
+    chunk_size = 64 * 1024
+
     def pre_loading(self):
+        self.objects = list(self.iter_objects())
+
+    def iter_objects(self):
         if isinstance(self.data, basestring):
             stream = StringIO(self.data)
         else:
             stream = self.data
 
         try:
-            self.objects = json.load(stream)
+            for obj in StreamDecoder(stream, self.chunk_size):
+                yield obj
         except Exception, e:
             raise base.LoadingError(e)
 
+class StreamDecoder(object):
+    """
+    Decodes a JSON document read from a stream. The elements of a
+    top-level array are decoded and returned one at a time. Thus,
+    neither the raw input nor the whole document has to be kept in
+    memory.
+    """
+    def __init__(self, stream, chunk_size):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def __iter__(self):
+        if self._next_char() == '[':
+            self.pos += 1
+            if self._next_char() == ']':
+                self.pos += 1
+            else:
+                while True:
+                    yield self._decode_value()
+                    char = self._next_char()
+                    self.pos += 1
+                    if char == ']':
+                        break
+                    if char != ',':
+                        raise ValueError('Expecting , delimiter at position %d' % (self.pos-1,))
+        else:
+            yield self._decode_value()
+        if self._next_char():
+            raise ValueError('Extra data at position %d' % (self.pos,))
+
+    def _read(self):
+        # Read at least as much as is buffered. Otherwise, decoding an
+        # object larger than chunk_size would take quadratic time.
+        data = self.stream.read(max(self.chunk_size, len(self.buffer) - self.pos))
+        if not data:
+            self.eof = True
+        self.buffer = self.buffer[self.pos:] + data
+        self.pos = 0
+
+    def _next_char(self):
+        """
+        Skips whitespace and returns the next character or an empty
+        string at the end of the stream.
+        """
+        while True:
+            self.pos = WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if self.eof:
+                return ''
+            self._read()
+
+    def _decode_value(self):
+        self._next_char()
+        while True:
+            try:
+                obj, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except ValueError:
+                if self.eof:
+                    raise
+                self._read()
+                continue
+            if end == len(self.buffer) and not self.eof:
+                # A number might continue in the next chunk.
+                self._read()
+                continue
+            self.pos = end
+            return obj
+
 def Deserializer(stream_or_string, **options):
     """
     Deserialize a stream or string of JSON data.
@@ -3,8 +3,10 @@ from django.conf import settings
 from django.utils.encoding import smart_str
 from django.core.serializers.base import DeserializationError
 from django.utils.xmlutils import SimplerXMLGenerator
-#from xml.dom import pulldom
-from xml.dom.minidom import parse
+try:
+    from xml.etree.cElementTree import iterparse
+except ImportError:
+    from xml.etree.ElementTree import iterparse
 
 from riv.serializers import base_serializer as base
 
@@ -41,24 +43,48 @@ class Serializer(base.Serializer):
             if isinstance(self._current[fieldname], list):
                 self._current[fieldname].insert(0, smart_str(related.model._meta.verbose_name))
 
+    def start_serialization(self):
+        super(Serializer, self).start_serialization()
+        # Objects are written as soon as they have been serialized.
+        self.streaming = self.finalize and not self.render_only
+        if self.streaming:
+            self._start_document()
+
+    def write_object(self, data):
+        if not self.streaming:
+            return super(Serializer, self).write_object(data)
+        self._write_object(data)
+
     def end_serialization(self):
+        if self.streaming:
+            self._end_document()
+            return
         super(Serializer, self).end_serialization()
         if not self.finalize:
             return
-        self.xml = SimplerXMLGenerator(self.stream, self.encoding)
-        self.xml.startDocument()
-        self.xml.startElement(self.ROOT_ELEMENT, {})
+        self._start_document()
 
         if not isinstance(self.objects, list):
             self.objects = [self.objects,]
 
         for object in self.objects:
-            self.indent(1)
-            name = self._get_xml_name(object)
-            self.xml.startElement(name, {})
-            self.handle_dict(object)
-            self.xml.endElement(name)
+            self._write_object(object)
+
+        self._end_document()
+
+    def _start_document(self):
+        self.xml = SimplerXMLGenerator(self.stream, self.encoding)
+        self.xml.startDocument()
+        self.xml.startElement(self.ROOT_ELEMENT, {})
 
+    def _write_object(self, object):
+        self.indent(1)
+        name = self._get_xml_name(object)
+        self.xml.startElement(name, {})
+        self.handle_dict(object)
+        self.xml.endElement(name)
+
+    def _end_document(self):
         self.indent(0)
         self.xml.endElement(self.ROOT_ELEMENT)
         self.xml.endDocument()
@@ -106,39 +132,82 @@ class Serializer(base.Serializer):
 
 class Loader(base.Loader):
     def pre_loading(self):
+        self.objects = list(self.iter_objects())
+
+    def iter_objects(self):
         if isinstance(self.data, basestring):
             stream = StringIO(self.data)
         else:
             stream = self.data
 
         try:
-            dom = parse(stream)
-            self.objects = self._dom_to_python(dom)
+            for obj in self._iterparse(stream):
+                yield obj
         except Exception, e:
             raise base.LoadingError(e)
 
-    def _dom_to_python(self, dom):
-        if dom.documentElement.nodeName == Serializer.ROOT_ELEMENT:
-            return self._handle_object_list(dom.documentElement)
-        return {}
-
-    def _handle_object_list(self, objlist):
-        return [self._handle_object(node) for node in objlist.childNodes]
-
-    def _handle_object(self, node):
+    def _iterparse(self, stream):
+        """
+        Converts the children of the root element one at a time and
+        clears them afterwards. Thus, the whole document is never kept
+        in memory.
+
+        Unlike the former minidom loader, whitespace that only indents
+        the elements and comments are ignored. A document with another
+        root element results in a single empty object instead of an
+        empty dictionary.
+        """
+        depth = 0
+        root = previous = None
+        for event, elem in iterparse(stream, events=('start', 'end')):
+            if event == 'start':
+                depth += 1
+                if depth == 1:
+                    if elem.tag != Serializer.ROOT_ELEMENT:
+                        yield {}
+                        return
+                    root = elem
+                elif depth == 2:
+                    # The text in front of an object is known once the object
+                    # starts. It results in an empty object.
+                    if self._text_before(root, previous):
+                        yield {}
+                    if previous is not None:
+                        previous.clear()
+                    root.clear()
+                continue
+            depth -= 1
+            if depth == 1:
+                yield self._handle_object(elem)
+                previous = elem
+            elif depth == 0:
+                if self._text_before(root, previous):
+                    yield {}
+
+    def _text_before(self, root, previous):
+        # Whitespace only indents the objects.
+        if previous is None:
+            return _strip(root.text)
+        return _strip(previous.tail)
+
+    def _handle_object(self, elem):
+        if elem.text and (not len(elem) or _strip(elem.text)):
+            return elem.text
         d = {}
-        for child in node.childNodes:
-            if child.nodeType == node.TEXT_NODE:
-                return child.nodeValue
-            elif child.nodeType == node.ELEMENT_NODE:
-                x = self._handle_object(child)
-                if d.has_key(child.nodeName):
-                    d[child.nodeName] = list(d[child.nodeName])
-                    d[child.nodeName].append(x)
-                else:
-                    d[child.nodeName] = x
+        for child in elem:
+            x = self._handle_object(child)
+            if d.has_key(child.tag):
+                d[child.tag] = list(d[child.tag])
+                d[child.tag].append(x)
+            else:
+                d[child.tag] = x
+            if _strip(child.tail):
+                return child.tail
         return d
 
+def _strip(text):
+    return text and text.strip()
+
 
 # TODO this should be class based and inherit from the base deserializer.
 def Deserializer(object_list, **options):
@@ -5,3 +5,6 @@ def render_to_rest(data):
 
 def render_form_error_to_rest(form):
     return RestResponse(form=form)
+
+def render_item_status_to_rest(items):
+    return RestResponse(items=items)
@@ -1,4 +1,4 @@
-from django.core.urlresolvers import reverse, NoReverseMatch
+from riv.api import get_api
 
 def traverse_dict(d, keys, return_parent=False):
     if return_parent:
@@ -38,11 +38,11 @@ def create_tree_with_val(d, keys, val):
         d[keys[0]] = {}
     create_tree_with_val(d[keys[0]], keys[1:], val)
 
+def get_url_for_pk(api_name, model, pk):
+    api = get_api(api_name)
+    if api is None:
+        return pk
+    return api.get_url_for_pk(model, pk)
+
 def get_url_for_object(api_name, obj, extra_id=None):
-    try:
-        if extra_id:
-            return reverse('object-%s-%s' % (api_name, obj._meta), kwargs={'id': extra_id})
-        else:
-            return reverse('object-%s-%s' % (api_name, obj._meta), kwargs={'id': obj.id})
-    except NoReverseMatch:
-        return obj._get_pk_val()
+    return get_url_for_pk(api_name, obj.__class__, extra_id or obj._get_pk_val())
@@ -0,0 +1,244 @@
+"""
+Validators for write requests that check the entities read by the
+loaders against the fields of a model without building Django forms.
+
+The checks of each model field (type, max_length, nullability,
+choices) are compiled into a function once per model. Foreign keys,
+many-to-many relations and unique fields are checked with one query
+per field for all entities of a request. The results provide the
+parts of the ModelForm API used by the StandaloneWrapper and their
+errors have the same shape as ``form.errors``.
+"""
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.forms.util import ErrorDict, ErrorList
+from django.utils.text import capfirst
+
+REQUIRED = u'This field is required.'
+INVALID_CHOICE = u'Select a valid choice. %s is not one of the available choices.'
+INVALID_RELATED_CHOICE = u'Select a valid choice. That choice is not one of the available choices.'
+INVALID_LIST = u'Enter a list of values.'
+INVALID = u'Enter a valid value.'
+
+EMPTY_VALUES = (None, '', [], ())
+
+# ModelValidator instances by model.
+_validators = {}
+
+def get_validator(model):
+    """
+    Returns the (cached) ModelValidator for the model.
+    """
+    try:
+        return _validators[model]
+    except KeyError:
+        validator = _validators[model] = ModelValidator(model)
+        return validator
+
+def compile_field(field):
+    """
+    Returns a function cleaning the value of a model field. It raises
+    a ValidationError for invalid values.
+    """
+    required = not field.blank
+    if field.rel:
+        to_python = field.rel.get_related_field().to_python
+    else:
+        to_python = field.to_python
+    choices = None
+    if field.choices:
+        choices = set(key for (key, value) in field.flatchoices)
+    validators = field.validators
+    invalid = _get_invalid_message(field)
+    # Callable defaults return a new value for each object.
+    get_default = field.get_default
+
+    def clean(value):
+        if value in EMPTY_VALUES:
+            if required:
+                raise ValidationError(REQUIRED)
+            return get_default()
+        try:
+            value = to_python(value)
+        except (TypeError, ValueError):
+            # E.g. a number or a list for a date.
+            raise ValidationError(invalid)
+        if choices is not None and value not in choices:
+            raise ValidationError(INVALID_CHOICE % (value,))
+        for validator in validators:
+            validator(value)
+        return value
+    return clean
+
+def _get_invalid_message(field):
+    """
+    Returns the message of the form field for values of a wrong type.
+    """
+    if field.rel:
+        return INVALID_RELATED_CHOICE
+    form_field = field.formfield()
+    if form_field is not None and 'invalid' in form_field.error_messages:
+        return form_field.error_messages['invalid']
+    return INVALID
+
+def compile_m2m_field(field):
+    """
+    Returns a function cleaning the list of primary keys of a
+    many-to-many field.
+    """
+    required = not field.blank
+    to_python = field.rel.to._meta.pk.to_python
+
+    def clean(value):
+        if value in EMPTY_VALUES:
+            if required:
+                raise ValidationError(REQUIRED)
+            return []
+        if isinstance(value, (basestring, int, long)):
+            # Like a form field, a single value is a list of one.
+            value = [value]
+        if not isinstance(value, (list, tuple)):
+            raise ValidationError(INVALID_LIST)
+        return [to_python(pk) for pk in value]
+    return clean
+
+
+class ValidatedData(object):
+    """
+    The result of the validation of one entity.
+    """
+    def __init__(self, instance):
+        self.instance = instance
+        self.cleaned_data = {}
+        self.changed_data = []
+        self.errors = ErrorDict()
+        self._m2m_data = {}
+
+    def is_valid(self):
+        return not self.errors
+
+    def add_error(self, name, messages):
+        self.errors.setdefault(name, ErrorList()).extend(messages)
+        self.cleaned_data.pop(name, None)
+        self._m2m_data.pop(name, None)
+
+    def save(self, commit=True):
+        for (name, value) in self.cleaned_data.items():
+            field = self.instance._meta.get_field(name)
+            setattr(self.instance, field.attname, value)
+        if commit:
+            self.instance.save()
+            self.save_m2m()
+        return self.instance
+
+    def save_m2m(self):
+        for (name, pks) in self._m2m_data.items():
+            setattr(self.instance, name, pks)
+
+
+class ModelValidator(object):
+    """
+    Validates entities against the editable fields of a model.
+    """
+    def __init__(self, model):
+        self.model = model
+        self.fields = []
+        self.m2m_fields = []
+        for field in model._meta.concrete_fields:
+            # ModelForms skip the same fields.
+            if field.editable and not isinstance(field, models.AutoField):
+                self.fields.append((field, compile_field(field)))
+        for field in model._meta.many_to_many:
+            if field.editable:
+                self.m2m_fields.append((field, compile_m2m_field(field)))
+
+    def get_forms(self, data_list, instances=None):
+        """
+        Returns a ValidatedData object for each entity. The n-th entity
+        updates the n-th instance. New objects are created if no
+        instances are given.
+        """
+        if instances is None:
+            instances = [self.model() for data in data_list]
+        results = [self._clean(data, instance) for (data, instance) in zip(data_list, instances)]
+        self._check_related(results)
+        self._check_unique(results)
+        return results
+
+    def _clean(self, data, instance):
+        result = ValidatedData(instance)
+        for (field, clean) in self.fields:
+            try:
+                value = clean(data.get(field.name))
+            except ValidationError, e:
+                result.add_error(field.name, e.messages)
+                continue
+            result.cleaned_data[field.name] = value
+            if instance._state.adding or getattr(instance, field.attname) != value:
+                result.changed_data.append(field.name)
+        for (field, clean) in self.m2m_fields:
+            try:
+                result._m2m_data[field.name] = clean(data.get(field.name))
+            except ValidationError, e:
+                result.add_error(field.name, e.messages)
+                continue
+            result.changed_data.append(field.name)
+        return result
+
+    def _check_related(self, results):
+        """
+        Checks that the related objects of all entities exist using a
+        single query per field.
+        """
+        for (field, clean) in self.fields:
+            if field.rel:
+                related_field = field.rel.get_related_field()
+                values = set(r.cleaned_data[field.name] for r in results if r.cleaned_data.get(field.name) is not None)
+                existing = self._existing(field.rel.to, related_field.name, values)
+                for r in results:
+                    value = r.cleaned_data.get(field.name)
+                    if value is not None and value not in existing:
+                        r.add_error(field.name, [INVALID_RELATED_CHOICE])
+        for (field, clean) in self.m2m_fields:
+            values = set()
+            for r in results:
+                values.update(r._m2m_data.get(field.name, []))
+            existing = self._existing(field.rel.to, 'pk', values)
+            for r in results:
+                missing = [pk for pk in r._m2m_data.get(field.name, []) if pk not in existing]
+                if missing:
+                    r.add_error(field.name, [INVALID_CHOICE % (pk,) for pk in missing])
+
+    def _check_unique(self, results):
+        """
+        Checks the unique fields against the database and against the
+        other entities of the request.
+        """
+        opts = self.model._meta
+        for (field, clean) in self.fields:
+            if not field.unique:
+                continue
+            message = field.error_messages['unique'] % {
+                'model_name': capfirst(opts.verbose_name),
+                'field_label': capfirst(field.verbose_name),
+            }
+            values = set(r.cleaned_data[field.name] for r in results if r.cleaned_data.get(field.name) is not None)
+            owners = {}
+            if values:
+                owners = dict(
+                    (value, pk) for (pk, value) in
+                    self.model._default_manager.filter(**{'%s__in' % field.name: values}).values_list('pk', field.attname)
+                )
+            seen = set()
+            for r in results:
+                value = r.cleaned_data.get(field.name)
+                if value is None:
+                    continue
+                if value in seen or (value in owners and owners[value] != r.instance.pk):
+                    r.add_error(field.name, [message])
+                seen.add(value)
+
+    def _existing(self, model, field_name, values):
+        if not values:
+            return set()
+        return set(model._default_manager.filter(**{'%s__in' % field_name: values}).values_list(field_name, flat=True))
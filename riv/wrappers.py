@@ -1,14 +1,20 @@
 import sys
 import json
-from django.core.exceptions import ObjectDoesNotExist, MultipleObjectsReturned
+from itertools import chain, islice, repeat
+from django.core.exceptions import ObjectDoesNotExist, MultipleObjectsReturned, ValidationError, NON_FIELD_ERRORS
 from django.utils.importlib import import_module
-from django.db import transaction
+from django.db import connections, router, transaction, DatabaseError
+from django.db.models import AutoField, Q, sql
+from django.db.models.deletion import Collector
 from django.http import Http404, HttpResponse, HttpResponseServerError, HttpResponseNotFound, HttpResponseBadRequest
-from django.forms.models import modelform_factory, modelformset_factory
+from django.forms.models import modelform_factory
 from django.shortcuts import get_object_or_404
+from django.utils.datastructures import MultiValueDict
 from riv.http import HttpResponseConflict, HttpResponseNotImplemented, HttpResponseNotAllowed, HttpResponseNoContent
-from riv import RestResponse
-from riv.shortcuts import render_to_rest, render_form_error_to_rest
+from riv import RestResponse, caching
+from riv.exceptions import ConfigurationError
+from riv.shortcuts import render_to_rest, render_form_error_to_rest, render_item_status_to_rest
+from riv.validators import get_validator
 
 
 class BaseWrapper(object):
@@ -16,6 +22,11 @@ class BaseWrapper(object):
     exclude_create = ['id',]
     fields = []
 
+    # Batch requests are passed to the views as formset-like POST
+    # variables (form-0-field, ...). Wrappers reading the list of
+    # objects from request.rest_data should set this to False.
+    batch_data_as_formset = True
+
     handler_methods = {
         'GET': 'read',
         'POST': 'create',
@@ -31,28 +42,47 @@ class BaseWrapper(object):
         'DELETE_list': 'delete_multiple',
     }
 
+    # The request types a handler can be defined for.
+    request_types = ('object', 'multiple', 'list')
+
     def get_handler_for(self, full_req_meth):
         """
-        Tries to find the handler for the given request method. If no 
-        specific handler for 'object' or 'multiple' is defined it
-        tries to find a common fallback handler for the given
-        request method.
+        Returns the handler for the given request method. If no 
+        specific handler for 'object' or 'multiple' is defined the
+        common fallback handler for the given request method is
+        returned.
         """
         try:
-            view_name = self.handler_methods[full_req_meth]
+            return self.get_handlers()[full_req_meth]
         except KeyError:
-            try:
-                # if req_meth does not contain the '_' this results in the
-                # same call as above leading to a KeyError.
-                view_name = self.handler_methods[full_req_meth.split('_')[0]]
-            except KeyError:
-                raise AttributeError('Invalid request method: %s' % full_req_meth)
+            raise AttributeError('Invalid request method: %s' % full_req_meth)
 
+    def get_handlers(self):
+        """
+        Returns a dictionary mapping each request method (e.g. 'GET'
+        or 'GET_object') to its handler. The handler_methods are only
+        resolved on the first call.
+        """
         try:
-            callback = self._get_callable(view_name)
-        except:
-            raise NotImplementedError()
-        return callback
+            return self._handlers
+        except AttributeError:
+            self._handlers = self._resolve_handlers()
+            return self._handlers
+
+    def _resolve_handlers(self):
+        handlers = {}
+        for (full_req_meth, view_name) in self.handler_methods.items():
+            try:
+                handlers[full_req_meth] = self._get_callable(view_name)
+            except AttributeError, e:
+                raise ConfigurationError('Invalid handler for %s in %s: %s' % (full_req_meth, type(self).__name__, e))
+        # Add the fallback handlers for all request types without a
+        # specific handler.
+        for (full_req_meth, callback) in handlers.items():
+            if not '_' in full_req_meth:
+                for req_type in self.request_types:
+                    handlers.setdefault('%s_%s' % (full_req_meth, req_type), callback)
+        return handlers
 
     def read(self, request, *args, **kwargs):
         raise Http404('Subclass the BaseWrapper and implement the "%s" method to make this resource available' % sys._getframe().f_code.co_name)
@@ -127,6 +157,30 @@ class BaseWrapper(object):
 
 class StandaloneWrapper(BaseWrapper):
 
+    batch_data_as_formset = False
+
+    # The form used to validate and save objects. By default a
+    # ModelForm with all fields of the model is used.
+    form_class = None
+
+    def get_form_class(self, model):
+        """
+        Returns the form class for the model. The ModelForm classes
+        are only built on the first request. Override this method to
+        choose forms per model.
+        """
+        if self.form_class is not None:
+            return self.form_class
+        try:
+            form_classes = self._form_classes
+        except AttributeError:
+            form_classes = self._form_classes = {}
+        try:
+            return form_classes[model]
+        except KeyError:
+            form_classes[model] = modelform_factory(model, fields="__all__")
+            return form_classes[model]
+
     def read(self, request, *args, **kwargs):
         rest_info = request.rest_info
         if not rest_info:
@@ -147,7 +201,9 @@ class StandaloneWrapper(BaseWrapper):
                 # Should never happen, as we are looking for the primary key.
                 return HttpResponseServerError()
         elif 'id_list' in kwargs:
-            q = model.objects.filter(id__in=kwargs.get('id_list').split(';'))
+            q = self._get_objects(model, kwargs.get('id_list'), rest_info.max_ids)
+            if isinstance(q, HttpResponse):
+                return q
         else:
             q = model.objects.all()
 
@@ -166,20 +222,31 @@ class StandaloneWrapper(BaseWrapper):
         else:
             model = rest_info.model
 
-        ModelFormSet = modelformset_factory(model, fields="__all__")
-
         if not request.method == 'POST':
             # This is actually a misconfiguration. If this method is
             # called without POST someone played around with the
             # BaseWrapper.handler_methods dictionary.
             return HttpResponseNotAllowed(rest_info.allowed_methods)
 
-        formset = ModelFormSet(request.POST, request.FILES)
-        if formset.is_valid():
-            objects = formset.save()
-            return render_to_rest(objects)
-        else:
-            return render_form_error_to_rest(formset)
+        # The objects are read from the request body chunk by chunk.
+        chunks = self._iter_form_chunks(model, request.rest_data, rest_info)
+        first = list(islice(chunks, 1))
+        if not first:
+            # Like an empty formset, a batch without objects is invalid.
+            return HttpResponseBadRequest()
+        chunks = chain(first, chunks)
+        if rest_info.report_item_status:
+            return render_item_status_to_rest(self._create_items(model, chunks, rest_info))
+
+        def save(forms):
+            if rest_info.bulk_creation:
+                return self._bulk_create(model, forms, rest_info.batch_size)
+            return [form.save() for form in forms]
+
+        objects, errors = self._save_batch(model, chunks, save)
+        if errors is not None:
+            return render_form_error_to_rest(errors)
+        return render_to_rest(objects)
 
     def create(self, request, *args, **kwargs):
         rest_info = request.rest_info
@@ -192,7 +259,7 @@ class StandaloneWrapper(BaseWrapper):
         else:
             model = rest_info.model
 
-        ModelForm = modelform_factory(model, fields="__all__")
+        ModelForm = self.get_form_class(model)
 
         if not request.method == 'POST':
             # This is actually a misconfiguration. If this method is
@@ -200,7 +267,10 @@ class StandaloneWrapper(BaseWrapper):
             # BaseWrapper.handler_methods dictionary.
             return HttpResponseNotAllowed(rest_info.allowed_methods)
 
-        form = ModelForm(request.POST, request.FILES)
+        if rest_info.fast_validation:
+            form = get_validator(model).get_forms(request.rest_data[:1] or [{}])[0]
+        else:
+            form = ModelForm(request.POST, request.FILES)
         if form.is_valid():
             obj = form.save()
             return render_to_rest(obj)
@@ -228,7 +298,7 @@ class StandaloneWrapper(BaseWrapper):
         except (ValueError, TypeError), e:
             return HttpResponseBadRequest()
 
-        ModelForm = modelform_factory(model, fields="__all__")
+        ModelForm = self.get_form_class(model)
 
         if not request.method == 'POST':
             # This is actually a misconfiguration. If this method is
@@ -244,7 +314,10 @@ class StandaloneWrapper(BaseWrapper):
         # "POST" (create) should be used.
         entity = get_object_or_404(model, pk=entity_id)
 
-        form = ModelForm(request.POST, instance=entity)
+        if rest_info.fast_validation:
+            form = get_validator(model).get_forms(request.rest_data[:1] or [{}], [entity])[0]
+        else:
+            form = ModelForm(request.POST, instance=entity)
 
         if form.is_valid():
             e = form.save()
@@ -255,15 +328,6 @@ class StandaloneWrapper(BaseWrapper):
             return render_form_error_to_rest(form)
 
     def update_multiple(self, request, *args, **kwargs):
-        # TODO This has to be implemented. ModelFormSets now if they
-        # have to create or update an entity by the hidden submission
-        # of the id: <input type="hidden" name="form-0-id" id="id_form-0-id" />
-        # Thus, we have to add the ids from the URI as POST values or
-        # as the sender to include the id in each entity (which makes more
-        # sense. But is against the HTTP-PUT specification.
-        #
-        # TODO: Review (incomplete) code below.
-        #
         rest_info = request.rest_info
         if not rest_info:
             # This should never happen.
@@ -274,14 +338,12 @@ class StandaloneWrapper(BaseWrapper):
         else:
             model = rest_info.model
 
-        # Put requests have to point to a resource entity and not to
-        # a handler resource. Thus, the indication of an id is
+        # Put requests have to point to resource entities and not to
+        # a handler resource. Thus, the indication of an id list is
         # mandatory.
-        if not kwargs.get('id') or not kwargs.get('id_list'):
+        if not kwargs.get('id_list'):
             return HttpResponseNotAllowed(rest_info.allowed_methods)
 
-        ModelFormSet = modelformset_factory(model)
-
         if not request.method == 'POST':
             # This is actually a misconfiguration. If this method is
             # called without POST* someone played around with the
@@ -292,13 +354,31 @@ class StandaloneWrapper(BaseWrapper):
             # changed the request type to POST for views.
             return HttpResponseNotAllowed(rest_info.allowed_methods)
 
-        formset = ModelFormSet(request.POST, request.FILES)
-        if formset.is_valid():
-            objects = formset.save()
-            return render_to_rest(objects)
+        entities = self._get_objects(model, kwargs['id_list'], rest_info.max_ids)
+        if isinstance(entities, HttpResponse):
+            return entities
+
+        # The n-th entity sent by the client updates the n-th object
+        # of the URI. A single entity is applied to all objects.
+        data = iter(request.rest_data)
+        first = list(islice(data, 2))
+        if len(first) == 1:
+            data = repeat(first[0], len(entities))
         else:
-            rest_info.error_by_form(formset)
-            return HttpResponse()
+            data = _iter_exactly(chain(first, data), len(entities))
+        chunks = self._iter_form_chunks(model, data, rest_info, entities)
+
+        def save(forms):
+            self._bulk_update(model, forms, rest_info.batch_size)
+            return [form.instance for form in forms]
+
+        try:
+            objects, errors = self._save_batch(model, chunks, save)
+        except _InvalidBatch:
+            return HttpResponseBadRequest()
+        if errors is not None:
+            return render_form_error_to_rest(errors)
+        return render_to_rest(objects)
 
     def delete(self, request, *args, **kwargs):
         rest_info = request.rest_info
@@ -319,13 +399,416 @@ class StandaloneWrapper(BaseWrapper):
             except MultipleObjectsReturned:
                 # Should never happen, as we are looking for the primary key.
                 return HttpResponseServerError()
+        elif rest_info.bulk_deletion and self._can_bulk_delete(model):
+            if 'id_list' in kwargs:
+                pks = self._parse_id_list(model, kwargs.get('id_list'), rest_info.max_ids)
+                if pks is None:
+                    return HttpResponseBadRequest()
+            elif rest_info.allow_batch_deletion:
+                pks = None
+            else:
+                return HttpResponseNotAllowed(rest_info.allowed_methods)
+            if pks is not None:
+                # Like the regular deletion, all objects have to exist.
+                existing = self._existing_pks(model, pks)
+                missing = [pk for pk in pks if not pk in existing]
+                if missing:
+                    return HttpResponseNotFound('Objects with ids %s do not exist.' % (', '.join([str(pk) for pk in missing]),))
+            response = HttpResponse()
+            response['X-Deleted-Count'] = self._bulk_delete(model, pks, rest_info.batch_size)
+            return response
         elif 'id_list' in kwargs:
-            q = model.objects.filter(id__in=kwargs.get('id_list').split(';'))
+            objects = self._get_objects(model, kwargs.get('id_list'), rest_info.max_ids)
+            if isinstance(objects, HttpResponse):
+                return objects
+            q = model.objects.filter(pk__in=[obj.pk for obj in objects])
         else:
             q = model.objects.all()
 
         q.delete()
+        # Deletions don't send signals to the cache.
+        caching.invalidate_deletion(model)
         return HttpResponse()
 
+    def _parse_id_list(self, model, id_list, max_ids):
+        """
+        Returns the primary keys of a ``;``-separated id list in their
+        original order without duplicates. Returns None if an id is
+        invalid or the list contains more than ``max_ids`` ids.
+        """
+        pks = []
+        seen = set()
+        try:
+            for i in id_list.split(';'):
+                pk = model._meta.pk.to_python(i)
+                if pk not in seen:
+                    seen.add(pk)
+                    pks.append(pk)
+        except ValidationError:
+            return None
+        if max_ids and len(pks) > max_ids:
+            return None
+        return pks
+
+    def _in_bulk(self, model, pks):
+        """
+        Returns a dictionary mapping the given primary keys to their
+        objects. Long lists are fetched with several queries to stay
+        below the parameter limit of the database.
+        """
+        db = router.db_for_read(model)
+        chunk_size = max(connections[db].ops.bulk_batch_size(['pk'], pks), 1)
+        objects = {}
+        for i in range(0, len(pks), chunk_size):
+            objects.update(model.objects.db_manager(db).in_bulk(pks[i:i+chunk_size]))
+        return objects
+
+    def _existing_pks(self, model, pks):
+        """
+        Returns the set of the given primary keys that exist. Like
+        _in_bulk, but without loading the objects.
+        """
+        db = router.db_for_write(model)
+        chunk_size = max(connections[db].ops.bulk_batch_size(['pk'], pks), 1)
+        existing = set()
+        for i in range(0, len(pks), chunk_size):
+            existing.update(model.objects.db_manager(db).filter(pk__in=pks[i:i+chunk_size]).values_list('pk', flat=True))
+        return existing
+
+    def _get_objects(self, model, id_list, max_ids):
+        """
+        Returns the objects of a ``;``-separated id list in the order of
+        the list or an error response if the list is invalid or objects
+        do not exist.
+        """
+        pks = self._parse_id_list(model, id_list, max_ids)
+        if pks is None:
+            return HttpResponseBadRequest()
+        objects = self._in_bulk(model, pks)
+        missing = [pk for pk in pks if not pk in objects]
+        if missing:
+            return HttpResponseNotFound('Objects with ids %s do not exist.' % (', '.join([str(pk) for pk in missing]),))
+        return [objects[pk] for pk in pks]
+
+    def _bulk_create(self, model, forms, batch_size):
+        """
+        Saves the objects of valid forms in a single transaction using
+        one INSERT per ``batch_size`` objects.
+
+        bulk_create does not return auto-generated primary keys. Thus,
+        the first object, referenced by the Location header, is saved on
+        its own and the other objects have no primary key afterwards.
+        ResourceOptions rejects the options needing them.
+        """
+        objects = [form.save(commit=False) for form in forms]
+        if not objects:
+            return objects
+        db = router.db_for_write(model)
+        manager = model.objects.db_manager(db)
+        with transaction.atomic(using=db):
+            if all(obj.pk is not None for obj in objects):
+                # The primary keys are known in advance.
+                manager.bulk_create(objects, batch_size=batch_size)
+                for obj in objects:
+                    obj._state.db = db
+                    obj._state.adding = False
+                for form in forms:
+                    form.save_m2m()
+            else:
+                objects[0].save(using=db)
+                manager.bulk_create(objects[1:], batch_size=batch_size)
+        # Bulk inserts don't send signals.
+        caching.invalidate(model, db)
+        return objects
+
+    def _iter_form_chunks(self, model, objects, rest_info, instances=None):
+        """
+        Reads the objects in chunks of ``batch_size`` objects and yields
+        the forms of each chunk. The n-th object updates the n-th
+        instance. Only the current chunk is kept in memory.
+        """
+        if instances is None:
+            # Like the empty forms of a formset, objects without any
+            # value are skipped.
+            objects = (data for data in objects if not _is_empty(data))
+        objects = iter(objects)
+        offset = 0
+        while True:
+            chunk = list(islice(objects, rest_info.batch_size))
+            if not chunk:
+                break
+            if instances is None:
+                yield self._get_forms(model, chunk, rest_info)
+            else:
+                yield self._get_forms(model, chunk, rest_info, instances[offset:offset+len(chunk)])
+            offset += len(chunk)
+
+    def _get_forms(self, model, objects, rest_info, instances=None):
+        if rest_info.fast_validation:
+            return get_validator(model).get_forms(objects, instances)
+        ModelForm = self.get_form_class(model)
+        if instances is None:
+            return [ModelForm(_to_form_data(data)) for data in objects]
+        return [ModelForm(_to_form_data(data), instance=instance) for (data, instance) in zip(objects, instances)]
+
+    def _save_batch(self, model, chunks, save):
+        """
+        Validates the forms chunk by chunk and saves each chunk with
+        ``save`` in a single transaction. Once a form fails, the
+        remaining forms are only validated and the transaction is rolled
+        back. Returns the saved objects and None or None and the errors
+        of all forms.
+        """
+        objects = []
+        errors = []
+        valid = True
+        try:
+            with transaction.atomic(using=router.db_for_write(model)):
+                for forms in chunks:
+                    # Validate all forms to collect all errors.
+                    valid = all([form.is_valid() for form in forms]) and valid
+                    errors.extend([form.errors for form in forms])
+                    if valid:
+                        objects.extend(save(forms))
+                if not valid:
+                    raise _ItemsFailed()
+        except _ItemsFailed:
+            return None, _FormErrors(errors)
+        return objects, None
+
+    def _create_items(self, model, chunks, rest_info):
+        """
+        Validates the forms chunk by chunk and returns the status of
+        each form. The valid forms of each chunk are written in their
+        own savepoint. If a chunk fails, its objects are saved one by one
+        to find the failing ones. Unless ``commit_valid_items`` is set,
+        nothing is saved if any form fails and the remaining forms are
+        only validated.
+        """
+        items = []
+        failed = False
+        db = router.db_for_write(model)
+        try:
+            with transaction.atomic(using=db):
+                for forms in chunks:
+                    valid = []
+                    for form in forms:
+                        if form.is_valid():
+                            items.append({'status': 201, 'object': form.instance})
+                            valid.append((form, items[-1]))
+                        else:
+                            items.append({'status': 400, 'error': form.errors})
+                            failed = True
+                    if not valid or (failed and not rest_info.commit_valid_items):
+                        # Don't touch the database if the request fails anyway.
+                        continue
+                    try:
+                        self._save_chunk(model, [form for (form, item) in valid], rest_info, db)
+                    except DatabaseError:
+                        for (form, item) in valid:
+                            self._reset_instance(model, form.instance)
+                            try:
+                                self._save_chunk(model, [form], rest_info, db)
+                            except DatabaseError:
+                                self._reset_instance(model, form.instance)
+                                item.pop('object')
+                                item.update(status=409, error={NON_FIELD_ERRORS: [u'The object could not be saved.']})
+                                failed = True
+                if failed and not rest_info.commit_valid_items:
+                    raise _ItemsFailed()
+        except _ItemsFailed:
+            return self._mark_failed_dependency(items)
+        return items
+
+    def _save_chunk(self, model, forms, rest_info, db):
+        if rest_info.bulk_creation:
+            # Writes the objects in a savepoint.
+            self._bulk_create(model, forms, rest_info.batch_size)
+        else:
+            with transaction.atomic(using=db):
+                for form in forms:
+                    form.save()
+
+    def _reset_instance(self, model, obj):
+        # The savepoint has been rolled back. Generated primary keys
+        # don't exist anymore.
+        if isinstance(model._meta.pk, AutoField):
+            obj.pk = None
+        obj._state.adding = True
+        obj._state.db = None
+
+    def _mark_failed_dependency(self, items):
+        for item in items:
+            if item.pop('object', None) is not None:
+                item['status'] = 424
+        return items
+
+    def _bulk_update(self, model, forms, batch_size):
+        """
+        Saves the changed fields of valid forms using one UPDATE per
+        ``batch_size`` objects and table. Each column is set with a
+        ``CASE`` on the primary key. All objects are written in a single
+        transaction.
+
+        Like QuerySet.update(), this neither calls save() nor sends
+        pre_save or post_save signals and auto_now fields are not
+        updated.
+        """
+        db = router.db_for_write(model)
+        connection = connections[db]
+        # The changed fields of each object grouped by the model of the
+        # table they belong to (a parent for inherited fields).
+        changes = []
+        tables = {}
+        for form in forms:
+            obj = form.save(commit=False)
+            fields = [f for f in model._meta.concrete_fields if f.name in form.changed_data and not f.primary_key]
+            if fields:
+                changes.append((obj, fields))
+                for field in fields:
+                    tables.setdefault(field.model._meta.concrete_model, set()).add(field)
+        with transaction.atomic(using=db):
+            for (table_model, columns) in tables.items():
+                # Each column needs two parameters per object, the WHERE
+                # clause one.
+                chunk_size = min(batch_size, max(connection.ops.bulk_batch_size(['pk'] * (2 * len(columns) + 1), changes), 1))
+                for i in range(0, len(changes), chunk_size):
+                    sql, params = _update_sql(table_model, columns, changes[i:i+chunk_size], connection)
+                    if sql:
+                        connection.cursor().execute(sql, params)
+            for form in forms:
+                form.save_m2m()
+        # Bulk updates don't send signals.
+        for table_model in tables:
+            caching.invalidate(table_model, db)
+
+    def _can_bulk_delete(self, model):
+        """
+        Objects can be deleted without loading them if there are no
+        signal receivers and no cascades for the model.
+        """
+        db = router.db_for_write(model)
+        return Collector(using=db).can_fast_delete(model.objects.db_manager(db).all())
+
+    def _bulk_delete(self, model, pks, batch_size):
+        """
+        Deletes the objects with the given primary keys (or all objects
+        if ``pks`` is None) using one DELETE per ``batch_size`` objects.
+        Each chunk is committed on its own to keep table locks short.
+        Thus, the deletion is not atomic. Returns the number of deleted
+        objects.
+        """
+        db = router.db_for_write(model)
+        manager = model.objects.db_manager(db)
+        count = 0
+        offset = 0
+        while True:
+            if pks is None:
+                chunk = list(manager.values_list('pk', flat=True)[:batch_size])
+            else:
+                chunk = pks[offset:offset+batch_size]
+                offset += batch_size
+            if not chunk:
+                break
+            with transaction.atomic(using=db):
+                query = sql.DeleteQuery(model)
+                query.get_initial_alias()
+                query.add_q(Q(pk__in=chunk))
+                cursor = query.get_compiler(db).execute_sql(None)
+                count += cursor.rowcount
+        # Bulk deletions don't send signals.
+        caching.invalidate(model, db)
+        return count
+
     read_multiple = read
     delete_multiple = delete
+
+
+class _ItemsFailed(Exception):
+    pass
+
+
+class _InvalidBatch(Exception):
+    pass
+
+
+class _FormErrors(object):
+    """
+    The errors of the forms of a batch. Rendered like the errors of a
+    formset.
+    """
+    def __init__(self, errors):
+        self.errors = errors
+
+
+def _update_sql(model, columns, changes, connection):
+    """
+    Returns the UPDATE statement setting the columns of the given
+    (object, changed fields) pairs and its parameters, or None.
+    """
+    qn = connection.ops.quote_name
+    pk = model._meta.pk
+    # PostgreSQL doesn't infer the type of the parameters of a CASE.
+    cast = connection.vendor == 'postgresql'
+    assignments = []
+    params = []
+    pks = set()
+    for field in sorted(columns, key=lambda f: f.column):
+        whens = []
+        for (obj, fields) in changes:
+            if field in fields:
+                if cast:
+                    whens.append('WHEN %%s THEN CAST(%%s AS %s)' % (field.db_type(connection),))
+                else:
+                    whens.append('WHEN %s THEN %s')
+                value = pk.get_db_prep_value(obj.pk, connection)
+                params.extend([value, field.get_db_prep_save(getattr(obj, field.attname), connection)])
+                pks.add(value)
+        if whens:
+            assignments.append('%s = CASE %s %s ELSE %s END' % (qn(field.column), qn(pk.column), ' '.join(whens), qn(field.column)))
+    if not assignments:
+        return None, None
+    pks = sorted(pks)
+    sql = 'UPDATE %s SET %s WHERE %s IN (%s)' % (
+        qn(model._meta.db_table), ', '.join(assignments), qn(pk.column), ', '.join(['%s'] * len(pks))
+    )
+    return sql, params + pks
+
+
+def _to_form_data(data):
+    """
+    Returns the object as form data. Like the POST data of a formset,
+    multiple-choice fields accept a list as well as a single value.
+    """
+    form_data = MultiValueDict()
+    for (key, value) in data.items():
+        if isinstance(value, (list, tuple)):
+            form_data.setlist(key, list(value))
+        else:
+            form_data[key] = value
+    return form_data
+
+
+def _is_empty(value):
+    if isinstance(value, dict):
+        return all([_is_empty(v) for v in value.values()])
+    if isinstance(value, (list, tuple)):
+        return all([_is_empty(v) for v in value])
+    if isinstance(value, basestring):
+        return not value.strip()
+    return value is None
+
+
+def _iter_exactly(iterable, count):
+    """
+    Yields the items of the iterable. Raises _InvalidBatch if it
+    doesn't contain exactly ``count`` items.
+    """
+    n = 0
+    for item in iterable:
+        n += 1
+        if n > count:
+            raise _InvalidBatch()
+        yield item
+    if n != count:
+        raise _InvalidBatch()
@@ -0,0 +1,94 @@
+"""
+Measures the objects RiV allocates for each request and the time needed
+to handle GET requests. RestInformation is compared to a copy of the
+class without __slots__.
+
+Run it from this directory:
+
+    python benchmark.py [number of requests]
+"""
+import gc
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'testapp.settings')
+
+def unslotted(cls):
+    """
+    Returns a copy of the class storing its attributes in a __dict__.
+    """
+    attrs = dict((k, v) for (k, v) in vars(cls).items() if k != '__slots__' and k not in cls.__slots__)
+    return type(cls.__name__, cls.__bases__, attrs)
+
+def instance_size(obj):
+    """
+    Returns the size of the object and its __dict__. Reading the
+    __dict__ of an object with __slots__ would create it. Thus, it is
+    looked up among the objects referenced by the object.
+    """
+    size = sys.getsizeof(obj)
+    slots = [name for name in getattr(type(obj), '__slots__', ()) if name != '__dict__' and hasattr(obj, name)]
+    slot_values = set(id(getattr(obj, name)) for name in slots)
+    for referent in gc.get_referents(obj):
+        if isinstance(referent, dict) and id(referent) not in slot_values:
+            size += sys.getsizeof(referent)
+    return size
+
+def allocations(create, number=10000):
+    """
+    Returns the number of objects allocated by create() and their size
+    in bytes. Only objects tracked by the garbage collector are found,
+    which includes all instances, lists and dictionaries.
+    """
+    gc.collect()
+    before = set(id(obj) for obj in gc.get_objects())
+    results = [create() for i in xrange(number)]
+    new = [obj for obj in gc.get_objects() if id(obj) not in before]
+    # Don't count the list of results.
+    return float(len(new) - 1) / number, float(sum(sys.getsizeof(obj) for obj in new) - sys.getsizeof(results)) / number
+
+def main(requests):
+    from django.core.management import call_command
+    from django.db import connection
+    from django.test.client import Client
+    from django.test.utils import setup_test_environment
+
+    from riv import resources
+    from riv.info import RestInformation
+    from polls.resources import StandaloneReadOnlyPollResource
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+    call_command('loaddata', 'initial_data.json', verbosity=0)
+
+    meta = StandaloneReadOnlyPollResource._meta
+    client = Client(HTTP_HOST='localhost:8000')
+    # Fill the caches of Django and RiV.
+    for path in ('/rest/srpr/', '/rest/srpr/1', '/rest/ipr/'):
+        for i in range(10):
+            client.get(path)
+    for (name, cls) in (('__slots__', RestInformation), ('__dict__', unslotted(RestInformation))):
+        print 'RestInformation (%s)' % (name,)
+        objects, size = allocations(lambda: cls(meta))
+        print '  allocations:   %.1f objects, %.0f bytes' % (objects, size)
+        print '  constructor:   %.2f us' % (timeit.timeit(lambda: cls(meta), number=100000) * 10,)
+
+        # Keep the objects created for the requests to measure them
+        # once the requests are done.
+        created = []
+        def record(meta):
+            created.append(cls(meta))
+            return created[-1]
+        resources.RestInformation = record
+        try:
+            for path in ('/rest/srpr/', '/rest/srpr/1', '/rest/ipr/'):
+                seconds = timeit.timeit(lambda: client.get(path), number=requests)
+                print '  GET %-14s %.3f ms/request' % (path, seconds * 1000 / requests)
+        finally:
+            resources.RestInformation = RestInformation
+        print '  instance/request: %.0f bytes' % (float(sum(instance_size(obj) for obj in created)) / len(created),)
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
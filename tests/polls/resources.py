@@ -21,6 +21,7 @@ class StandaloneTagResource(Resource):
     _wrapper = StandaloneWrapper()
     class Meta:
         model = Tag
+        reverse = True
         allowed_methods = ['GET', 'POST', 'PUT', 'DELETE']
         allow_batch_creation = True
 
@@ -29,6 +30,24 @@ class StandaloneReadOnlyChoiceResource(Resource):
     class Meta:
         model = Choice
         allowed_methods = ['GET',]
+        max_ids = 3
+
+class StandaloneBulkDeleteChoiceResource(Resource):
+    _wrapper = StandaloneWrapper()
+    class Meta:
+        model = Choice
+        bulk_deletion = True
+        batch_size = 2
+        allowed_methods = ['DELETE',]
+
+class StandaloneBulkBatchDeleteChoiceResource(Resource):
+    _wrapper = StandaloneWrapper()
+    class Meta:
+        model = Choice
+        bulk_deletion = True
+        allow_batch_deletion = True
+        batch_size = 3
+        allowed_methods = ['DELETE',]
 
 class ReadOnlyPollResource(Resource):
     _wrapper = PollWrapper()
@@ -150,6 +169,14 @@ class StandaloneReadOnlyPollResource(Resource):
         allowed_methods = ['GET']
         model = Poll
 
+class StandaloneExportPollResource(Resource):
+    _wrapper = StandaloneWrapper()
+    class Meta:
+        allowed_methods = ['GET']
+        model = Poll
+        export_jobs = True
+        export_threshold = 2
+
 class StandalonePutOnlyPollResource(Resource):
     _wrapper = StandaloneWrapper()
     class Meta:
@@ -164,6 +191,81 @@ class StandaloneBatchPostPollResource(Resource):
         render_object_after_creation = True
         allowed_methods = ['POST',]
 
+class StandaloneFastValidationPollResource(Resource):
+    _wrapper = StandaloneWrapper()
+    class Meta:
+        model = Poll
+        allow_batch_creation = True
+        render_object_after_creation = True
+        fast_validation = True
+
+class StandaloneFastValidationChoiceResource(Resource):
+    _wrapper = StandaloneWrapper()
+    class Meta:
+        model = Choice
+        allow_batch_creation = True
+        render_object_after_creation = True
+        fast_validation = True
+
+class StandaloneBulkPostTagResource(Resource):
+    _wrapper = StandaloneWrapper()
+    class Meta:
+        model = Tag
+        allow_batch_creation = True
+        bulk_creation = True
+        batch_size = 1
+        allowed_methods = ['POST',]
+
+class StandaloneBulkPostChoiceResource(Resource):
+    _wrapper = StandaloneWrapper()
+    class Meta:
+        model = Choice
+        allow_batch_creation = True
+        bulk_creation = True
+        allowed_methods = ['POST',]
+
+class StandaloneItemStatusPollResource(Resource):
+    _wrapper = StandaloneWrapper()
+    class Meta:
+        model = Poll
+        allow_batch_creation = True
+        report_item_status = True
+        batch_size = 2
+        allowed_methods = ['POST',]
+
+class StandalonePartialPostPollResource(Resource):
+    _wrapper = StandaloneWrapper()
+    class Meta:
+        model = Poll
+        allow_batch_creation = True
+        report_item_status = True
+        commit_valid_items = True
+        batch_size = 2
+        allowed_methods = ['POST',]
+
+class StandaloneIdempotentPollResource(Resource):
+    _wrapper = StandaloneWrapper()
+    class Meta:
+        model = Poll
+        idempotency_keys = True
+        render_object_after_creation = True
+        allowed_methods = ['POST',]
+
+class StandaloneLimitedPollResource(Resource):
+    _wrapper = StandaloneWrapper()
+    class Meta:
+        model = Poll
+        max_concurrent_requests = 1
+        allowed_methods = ['GET',]
+
+class StandaloneCachedPollResource(Resource):
+    _wrapper = StandaloneWrapper()
+    class Meta:
+        model = Poll
+        cache = {'timeout': 60}
+        inline = ['tags']
+        allowed_methods = ['GET',]
+
 class StandalonePostOnlyPollResource(Resource):
     _wrapper = StandaloneWrapper()
     class Meta:
@@ -12,7 +12,12 @@ class BaseTestCase(TestCase):
     def tearDown(self):
         pass
 
+from api import *
 from resources import *
 from serializers import *
 from deserializers import *
+from loaders import *
+from limits import *
+from mime import *
 from utils import *
+from wrappers import *
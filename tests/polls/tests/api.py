@@ -0,0 +1,197 @@
+import json
+
+from django.core.urlresolvers import reverse, NoReverseMatch
+
+from riv import idempotency
+from riv.api import Api, get_api
+from riv.utils import get_url_for_object
+from polls.models import Poll, Tag
+from polls.resources import ReadOnlyPollResource, StandaloneReadOnlyPollResource, StandaloneTagResource
+from polls.tests import BaseTestCase
+from testapp.urls import api as rest_api
+
+class ApiDispatchTestCase(BaseTestCase):
+
+    def testList(self):
+        response = self.client.get('/rest/ropr')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get('/rest/ropr/')
+        self.assertEqual(response.status_code, 200)
+
+    def testObject(self):
+        response = self.client.get('/rest/ropr/1/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue('"id": 1' in response.content)
+
+    def testMultiple(self):
+        response = self.client.get('/rest/srpr/1;2/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue('"id": 1' in response.content)
+        self.assertTrue('"id": 2' in response.content)
+
+    def testNotFound(self):
+        self.assertEqual(self.client.get('/rest/unknown/').status_code, 404)
+        self.assertEqual(self.client.get('/rest/unknown/1/').status_code, 404)
+        self.assertEqual(self.client.get('/rest/ropr/abc/').status_code, 404)
+        self.assertEqual(self.client.get('/rest/ropr/1/2/').status_code, 404)
+
+    def testFallThrough(self):
+        response = self.client.get('/rest/legacy/1/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue('What is it about?' in response.content)
+
+    def testReverse(self):
+        api = get_api('rest1')
+        self.assertEqual(api.reverse('object-rest1-polls.poll', kwargs={'id': 1}), '/rest/ropr/1')
+        self.assertEqual(api.reverse('list-rest1-polls.tag'), '/rest/str')
+        # The named patterns of the resources are not part of the URLconf.
+        self.assertRaises(NoReverseMatch, reverse, 'list-rest1-polls.tag')
+
+class ApiUrlsTestCase(BaseTestCase):
+
+    def setUp(self):
+        super(ApiUrlsTestCase, self).setUp()
+        self.resources = [StandaloneTagResource(name='str'), ReadOnlyPollResource(name='ropr'), StandaloneReadOnlyPollResource(name='srpr')]
+
+    def tearDown(self):
+        # Registering sets the api name on the shared resource options.
+        for resource in self.resources:
+            resource._meta.api_name = 'rest1'
+
+    def testCachedUrls(self):
+        api = Api(name='testapi')
+        api.register(self.resources[0])
+        urls = api.urls
+        self.assertTrue(api.urls is urls)
+        api.register(self.resources[1])
+        self.assertFalse(api.urls is urls)
+        # The resources are matched by one pattern per Api.
+        self.assertEqual(len(api.urls), len(urls))
+
+    def testGetApi(self):
+        self.assertTrue(get_api('rest1') is not None)
+        self.assertEqual(get_api('rest1').name, 'rest1')
+        self.assertEqual(get_api('doesnotexist'), None)
+
+    def testResourceIndex(self):
+        api = Api(name='testapi')
+        api.register(self.resources[2])
+        self.assertTrue(api.get_resource_for_model(Poll) is self.resources[2])
+        api.register(self.resources[1])
+        # ReadOnlyPollResource has "reverse=True"
+        self.assertTrue(api.get_resource_for_model(Poll) is self.resources[1])
+        self.assertTrue(api.get_resource('srpr') is self.resources[2])
+        api.unregister(self.resources[1])
+        self.assertTrue(api.get_resource_for_model(Poll) is self.resources[2])
+        self.assertEqual(api.get_resource('ropr'), None)
+        api.unregister(self.resources[2])
+        self.assertEqual(api.get_resource_for_model(Poll), None)
+        self.assertEqual(api._resource_list, {})
+
+    def testUrlForPk(self):
+        api = get_api('rest1')
+        self.assertEqual(api.get_url_for_pk(Poll, 1), '/rest/ropr/1')
+        self.assertEqual(api.get_url_for_pk(Tag, 2), '/rest/str/2')
+        self.assertEqual(get_url_for_object('rest1', Poll.objects.get(pk=2)), '/rest/ropr/2')
+        self.assertEqual(get_url_for_object('rest1', Poll.objects.only('question').get(pk=2)), '/rest/ropr/2')
+
+    def testUrlForPkWithoutResource(self):
+        api = Api(name='testapi')
+        self.assertEqual(api.get_url_for_pk(Poll, 1), 1)
+        self.assertEqual(get_url_for_object('doesnotexist', Poll.objects.get(pk=1)), 1)
+        # The api is not part of the URLconf.
+        api.register(self.resources[0])
+        self.assertEqual(api.get_url_for_pk(Tag, 1), 1)
+
+class ApiBatchTestCase(BaseTestCase):
+
+    def batch(self, operations, path='/rest/batch', **extra):
+        response = self.client.post(path, json.dumps(operations), content_type='application/json', **extra)
+        return response
+
+    def testBatch(self):
+        response = self.batch([
+            {'method': 'GET', 'path': 'ropr/1'},
+            {'method': 'PUT', 'path': '/rest/srwpr/2', 'body': {'pub_date': '2011-10-20 19:00:00', 'question': 'Has it changed?', 'tags': [1]}},
+            {'method': 'GET', 'path': 'srpr/?format=json'},
+            {'method': 'DELETE', 'path': 'srwpr/1'},
+        ])
+        self.assertEqual(response.status_code, 200)
+        results = json.loads(response.content)[0]['responses']
+        self.assertEqual([result['status'] for result in results], [200, 200, 200, 204])
+        self.assertEqual(results[0]['body']['question'], 'What is it about?')
+        self.assertEqual(results[1]['body']['question'], 'Has it changed?')
+        self.assertEqual(results[2]['headers']['Accept-Ranges'], 'items')
+        self.assertEqual(len(results[2]['body']), 2)
+        self.assertEqual(results[3]['body'], None)
+        self.assertEqual(Poll.objects.get(pk=2).question, 'Has it changed?')
+        self.assertFalse(Poll.objects.filter(pk=1).exists())
+
+    def testBatchXml(self):
+        response = self.batch([{'method': 'GET', 'path': 'str/1'}], HTTP_ACCEPT='application/xml')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/xml')
+        self.assertTrue('<status>200</status>' in response.content)
+
+    def testBatchNotFound(self):
+        response = self.batch([
+            {'method': 'GET', 'path': 'unknown/1'},
+            {'method': 'GET', 'path': '/other/ropr/1'},
+            {'method': 'GET', 'path': 'srpr/99'},
+            {'method': 'POST', 'path': 'batch', 'body': []},
+        ])
+        self.assertEqual(response.status_code, 207)
+        results = json.loads(response.content)[0]['responses']
+        self.assertEqual([result['status'] for result in results], [404, 404, 404, 400])
+
+    def testBatchAtomic(self):
+        operations = [
+            {'method': 'DELETE', 'path': 'srwpr/1'},
+            {'method': 'DELETE', 'path': 'srwpr/99'},
+        ]
+        response = self.batch(operations, path='/rest/batch?atomic')
+        self.assertEqual(response.status_code, 400)
+        results = json.loads(response.content)[0]['responses']
+        self.assertEqual([result['status'] for result in results], [204, 404])
+        self.assertTrue(Poll.objects.filter(pk=1).exists())
+
+        # The successful requests are applied.
+        response = self.batch(operations)
+        self.assertEqual(response.status_code, 207)
+        self.assertFalse(Poll.objects.filter(pk=1).exists())
+
+    def testBatchInvalid(self):
+        self.assertEqual(self.client.get('/rest/batch').status_code, 405)
+        self.assertEqual(self.batch([]).status_code, 400)
+        self.assertEqual(self.batch([{'path': 'ropr/1'}]).status_code, 400)
+        self.assertEqual(self.batch([{'method': 1, 'path': 'srpr/1'}]).status_code, 400)
+        self.assertEqual(self.batch([{'method': 'GET', 'path': ['srpr/1']}]).status_code, 400)
+        self.assertEqual(self.batch([{'method': 'TRACE', 'path': 'srpr/1'}]).status_code, 400)
+        response = self.client.post('/rest/batch', '[{"method": "GET"', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+class ApiBatchIdempotencyTestCase(BaseTestCase):
+
+    def setUp(self):
+        super(ApiBatchIdempotencyTestCase, self).setUp()
+        idempotency.get_idempotency_cache().clear()
+        rest_api.idempotency_keys = True
+
+    def tearDown(self):
+        rest_api.idempotency_keys = False
+        super(ApiBatchIdempotencyTestCase, self).tearDown()
+
+    def testRepeatedBatch(self):
+        operations = json.dumps([
+            {'method': 'POST', 'path': 'sidpr', 'body': {'pub_date': '2011-10-20 19:00:00', 'question': 'New?', 'tags': [1]}},
+            {'method': 'DELETE', 'path': 'srwpr/1'},
+        ])
+        count = Poll.objects.count()
+        response = self.client.post('/rest/batch', operations, content_type='application/json', HTTP_IDEMPOTENCY_KEY='abc')
+        self.assertEqual(response.status_code, 200)
+        results = json.loads(response.content)[0]['responses']
+        self.assertEqual([result['status'] for result in results], [201, 204])
+        replayed = self.client.post('/rest/batch', operations, content_type='application/json', HTTP_IDEMPOTENCY_KEY='abc')
+        self.assertEqual(replayed['Idempotent-Replayed'], 'true')
+        self.assertEqual(replayed.content, response.content)
+        self.assertEqual(count, Poll.objects.count())
@@ -0,0 +1,82 @@
+import threading
+
+from django.test import TestCase
+from riv.limits import ConcurrencyLimiter
+from polls.tests import BaseTestCase
+from testapp.urls import api as rest_api
+
+class ConcurrencyLimiterTestCase(TestCase):
+
+    def testLimit(self):
+        limiter = ConcurrencyLimiter(2)
+        self.assertTrue(limiter.acquire())
+        self.assertTrue(limiter.acquire())
+        self.assertFalse(limiter.acquire())
+        limiter.release()
+        self.assertTrue(limiter.acquire())
+        stats = limiter.get_stats()
+        self.assertEqual(stats['active'], 2)
+        self.assertEqual(stats['peak'], 2)
+        self.assertEqual(stats['accepted'], 3)
+        self.assertEqual(stats['rejected'], 1)
+
+    def testQueue(self):
+        limiter = ConcurrencyLimiter(1, queue_size=1, timeout=5)
+        self.assertTrue(limiter.acquire())
+        results = []
+        thread = threading.Thread(target=lambda: results.append(limiter.acquire()))
+        thread.start()
+        while not limiter.get_stats()['waiting']:
+            thread.join(0.01)
+        # The queue is full.
+        self.assertFalse(limiter.acquire())
+        limiter.release()
+        thread.join()
+        self.assertEqual(results, [True])
+        stats = limiter.get_stats()
+        self.assertEqual((stats['active'], stats['waiting'], stats['queued'], stats['rejected']), (1, 0, 1, 1))
+
+    def testQueueTimeout(self):
+        limiter = ConcurrencyLimiter(1, queue_size=1, timeout=0.01)
+        self.assertTrue(limiter.acquire())
+        self.assertFalse(limiter.acquire())
+        stats = limiter.get_stats()
+        self.assertEqual((stats['waiting'], stats['queued'], stats['rejected']), (0, 1, 1))
+
+class ResourceConcurrencyTestCase(BaseTestCase):
+
+    def setUp(self):
+        super(ResourceConcurrencyTestCase, self).setUp()
+        self.limiter = rest_api.get_resource('slpr').limiter
+
+    def testLimitedResource(self):
+        response = self.client.get('/rest/slpr/1')
+        self.assertEqual(response.status_code, 200)
+        # Another request is being handled.
+        self.limiter.acquire()
+        try:
+            response = self.client.get('/rest/slpr/1')
+        finally:
+            self.limiter.release()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+        # Other resources are not affected.
+        self.assertEqual(self.client.get('/rest/srpr/1').status_code, 200)
+
+    def testApiLimit(self):
+        rest_api.limiter = ConcurrencyLimiter(1)
+        try:
+            rest_api.limiter.acquire()
+            self.assertEqual(self.client.get('/rest/srpr/1').status_code, 503)
+            rest_api.limiter.release()
+            self.assertEqual(self.client.get('/rest/srpr/1').status_code, 200)
+        finally:
+            rest_api.limiter = None
+
+    def testStats(self):
+        self.client.get('/rest/slpr/1')
+        stats = rest_api.get_concurrency_stats()
+        self.assertEqual(stats['api'], None)
+        self.assertEqual(stats['resources'].keys(), ['slpr'])
+        self.assertEqual(stats['resources']['slpr']['active'], 0)
+        self.assertTrue(stats['resources']['slpr']['accepted'] > 0)
@@ -1 +1,98 @@
-# TODO
+from StringIO import StringIO
+
+from riv.serializers import json_serializer, xml_serializer
+from riv.serializers.base_serializer import LoadingError
+from polls.tests import BaseTestCase
+
+class JsonLoaderTestCase(BaseTestCase):
+
+    def setUp(self):
+        self.data = '[{"question": "Is it new?", "votes": 12345, "tags": [1, 2]}, {"question": "And is that new?", "votes": 6789, "tags": []}]'
+
+    def testLoadString(self):
+        loader = json_serializer.Loader()
+        loader.load(self.data)
+        self.assertEqual(
+            loader.get_objects(),
+            [{'question': 'Is it new?', 'votes': 12345, 'tags': [1, 2]}, {'question': 'And is that new?', 'votes': 6789, 'tags': []}]
+        )
+
+    def testLoadSingleObject(self):
+        loader = json_serializer.Loader()
+        loader.load(StringIO(' {"question": "Is it new?"} '))
+        self.assertEqual(loader.get_objects(), [{'question': 'Is it new?'}])
+
+    def testIterloadSmallChunks(self):
+        loader = json_serializer.Loader()
+        loader.chunk_size = 3
+        self.assertEqual(
+            list(loader.iterload(StringIO(self.data), exclude=['tags'], map_fields={'choice': 'question'})),
+            [{'choice': 'Is it new?', 'votes': 12345}, {'choice': 'And is that new?', 'votes': 6789}]
+        )
+
+    def testIterloadIsLazy(self):
+        loader = json_serializer.Loader()
+        loader.chunk_size = 4
+        stream = StringIO(self.data)
+        objects = loader.iterload(stream)
+        self.assertEqual(objects.next()['votes'], 12345)
+        self.assertTrue(stream.tell() < len(self.data))
+
+    def testLoadEmptyList(self):
+        loader = json_serializer.Loader()
+        loader.load('[ ]')
+        self.assertEqual(loader.get_objects(), [])
+
+    def testLoadInvalid(self):
+        for data in ['[{"question": "Is it new?"}', '[{"question": "Is it new?"} {}]', '{"question": 1} x', '']:
+            loader = json_serializer.Loader()
+            self.assertRaises(LoadingError, loader.load, data)
+
+class XmlLoaderTestCase(BaseTestCase):
+
+    def setUp(self):
+        self.data = '<?xml version="1.0" encoding="utf-8"?>\n<objects><poll><question>Is it new?</question><tags><tag>1</tag><tag>2</tag></tags></poll><poll><question>And is that new?</question><choice><name>Red</name><votes>3</votes></choice></poll></objects>'
+
+    def testLoad(self):
+        loader = xml_serializer.Loader()
+        loader.load(self.data)
+        self.assertEqual(
+            loader.get_objects(),
+            [{'question': 'Is it new?', 'tags': {'tag': ['1', '2']}}, {'question': 'And is that new?', 'choice': {'name': 'Red', 'votes': '3'}}]
+        )
+
+    def testLoadIndented(self):
+        loader = xml_serializer.Loader()
+        loader.load('<objects>\n  <poll>\n    <question>Is it new?</question>\n    <tags>2</tags>\n  </poll>\n</objects>\n')
+        self.assertEqual(loader.get_objects(), [{'question': 'Is it new?', 'tags': '2'}])
+
+    def testLoadIndentedList(self):
+        # Whitespace between the elements and comments are ignored.
+        data = '<objects>\n  <!-- first -->\n  <poll>\n    <question>Is it new?</question>\n    <tags>1</tags>\n    <tags>2</tags>\n  </poll>\n  <poll>\n    <question>And that?</question>\n  </poll>\n</objects>\n'
+        expected = [{'question': 'Is it new?', 'tags': ['1', '2']}, {'question': 'And that?'}]
+        loader = xml_serializer.Loader()
+        loader.load(data)
+        self.assertEqual(loader.get_objects(), expected)
+        self.assertEqual(list(xml_serializer.Loader().iterload(StringIO(data))), expected)
+
+    def testLoadEmpty(self):
+        loader = xml_serializer.Loader()
+        loader.load('<objects></objects>')
+        self.assertEqual(loader.get_objects(), [])
+
+    def testLoadInvalidRoot(self):
+        loader = xml_serializer.Loader()
+        loader.load('<poll><question>Is it new?</question></poll>')
+        # Like an object without fields. It fails validation.
+        self.assertEqual(loader.get_objects(), [{}])
+        objects = xml_serializer.Loader().iterload(StringIO('<poll><question>Is it new?</question></poll>'))
+        self.assertEqual(list(objects), [{}])
+
+    def testIterload(self):
+        loader = xml_serializer.Loader()
+        objects = loader.iterload(StringIO(self.data), exclude=['tags'])
+        self.assertEqual(objects.next(), {'question': 'Is it new?'})
+
+    def testLoadInvalid(self):
+        loader = xml_serializer.Loader()
+        self.assertRaises(LoadingError, loader.load, '<objects><poll>')
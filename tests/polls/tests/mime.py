@@ -0,0 +1,44 @@
+from django.core import serializers
+from django.test.client import RequestFactory
+from django.test.utils import override_settings
+
+from riv import mime
+from polls.tests import BaseTestCase
+
+class FormatCacheTestCase(BaseTestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        mime.clear_format_cache()
+
+    def tearDown(self):
+        mime.clear_format_cache()
+
+    def testCachedFormat(self):
+        request = self.factory.get('/rest/ropr/', HTTP_ACCEPT='application/json, application/xml')
+        self.assertEqual(mime.get_available_format(request), 'json')
+        self.assertEqual(mime._format_cache.values(), ['json'])
+        self.assertEqual(mime.get_available_format(request), 'json')
+        self.assertEqual(len(mime._format_cache), 1)
+
+    def testFormatParameter(self):
+        self.assertEqual(mime.get_available_format(self.factory.get('/rest/ropr/', {'format': 'xml'})), 'xml')
+        self.assertEqual(mime.get_available_format(self.factory.get('/rest/ropr/')), 'json')
+        self.assertEqual(len(mime._format_cache), 2)
+
+    @override_settings(RIV_FORMAT_CACHE_SIZE=2)
+    def testCacheSize(self):
+        for accept in ['application/json', 'application/xml', 'text/xml']:
+            mime.get_available_format(self.factory.get('/rest/ropr/', HTTP_ACCEPT=accept))
+        self.assertEqual(mime._format_cache.values(), ['xml', 'xml'])
+
+    def testRegisterSerializer(self):
+        request = self.factory.get('/rest/ropr/', HTTP_ACCEPT='text/yaml')
+        self.assertEqual(mime.get_available_format(request), None)
+        serializers.register_serializer('restyaml', 'riv.serializers.json_serializer')
+        try:
+            self.assertTrue('restyaml' in mime.get_serializers())
+            self.assertEqual(mime.get_available_format(request), 'yaml')
+        finally:
+            serializers.unregister_serializer('restyaml')
+        self.assertFalse('restyaml' in mime.get_serializers())
@@ -1,5 +1,7 @@
 from django.test import Client, TestCase
-from polls.models import Poll, Choice
+from polls.models import Poll, Choice, Tag
+from riv.exceptions import ConfigurationError
+from riv.resources import ResourceOptions
 
 from polls.tests import BaseTestCase
 
@@ -346,3 +348,35 @@ class MapTestCase(BaseTestCase):
         response = self.client.get('/rest/mpr/2')
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.content, '{"poll_date": "2011-10-20T18:05:00", "question": "Is it about that?", "id": 2, "tags": ["/rest/str/1"]}')
+
+class ResourceOptionsTestCase(BaseTestCase):
+
+    def setUp(self):
+        class Meta:
+            model = Poll
+            allowed_methods = ['GET', 'PUT_object', 'DELETE_multiple']
+            fields = ['question', {'pub_date': ['GET', 'POST']}]
+            exclude = [{'tags': ['PUT']}]
+        self.meta = ResourceOptions(Meta)
+
+    def testAllowedMethods(self):
+        self.assertEqual(sorted(self.meta.allowed_methods_for('object')), ['GET', 'PUT'])
+        self.assertEqual(sorted(self.meta.allowed_methods_for('multiple')), ['DELETE', 'GET'])
+        self.assertEqual(self.meta.allowed_methods_for('list'), ['GET'])
+        self.assertTrue(self.meta.is_allowed('PUT', 'object'))
+        self.assertFalse(self.meta.is_allowed('PUT', 'list'))
+        self.assertFalse(self.meta.is_allowed('POST', 'object'))
+
+    def testFieldsAndExclude(self):
+        self.assertEqual(self.meta.fields_for('GET'), ['question', 'pub_date'])
+        self.assertEqual(self.meta.fields_for('PUT'), ['question'])
+        self.assertEqual(self.meta.exclude_for('PUT'), ['tags'])
+        self.assertEqual(self.meta.exclude_for('GET'), [])
+        self.assertEqual(self.meta.exclude_for('PATCH'), [])
+
+    def testBulkCreationOptions(self):
+        # The auto-generated primary keys of bulk inserts are unknown.
+        for (model, options) in ((Tag, {'render_object_after_creation': True}), (Tag, {'report_item_status': True}), (Poll, {})):
+            Meta = type('Meta', (), dict(options, model=model, bulk_creation=True))
+            self.assertRaises(ConfigurationError, ResourceOptions, Meta)
+        ResourceOptions(type('Meta', (), {'model': Tag, 'bulk_creation': True}))
@@ -1,5 +1,22 @@
+import datetime
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.urlresolvers import get_script_prefix
+from django.db import connection
 from django.test import Client, TestCase
-from polls.models import Poll, Choice
+from django.test.client import RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+from riv import caching, exports, idempotency
+from riv.resources import ResourceOptions
+from riv.wrappers import StandaloneWrapper
+from polls.models import Poll, Choice, Tag
 
 from polls.tests import BaseTestCase
 
@@ -30,6 +47,118 @@ class StandaloneReadOnlyTestCase(BaseTestCase):
         response = self.client.delete('/rest/srpr/1')
         self.assertEqual(response.status_code, 405)
 
+    def testHeadPolls(self):
+        response = self.client.head('/rest/srpr/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, '')
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response['X-Item-Count'], '2')
+        etag = response['ETag']
+        self.assertEqual(self.client.head('/rest/srpr/')['ETag'], etag)
+
+        Poll.objects.filter(pk=2).update(question='Has it changed?')
+        self.assertNotEqual(self.client.head('/rest/srpr/')['ETag'], etag)
+
+    def testHeadMatchesGet(self):
+        for accept in ('application/json', 'application/xml'):
+            head = self.client.head('/rest/srpr/', HTTP_ACCEPT=accept)
+            get = self.client.get('/rest/srpr/', HTTP_ACCEPT=accept)
+            self.assertEqual(head['ETag'], get['ETag'])
+            # The length is only known for cached responses.
+            self.assertFalse(head.has_header('Content-Length'))
+
+    def testHeadWithoutSerialization(self):
+        # One query for the polls and one for their tags, without
+        # building the URIs of the tags.
+        with self.assertNumQueries(2):
+            response = self.client.head('/rest/srpr/')
+        self.assertEqual(response['X-Item-Count'], '2')
+
+    def testHeadRelationChanged(self):
+        etag = self.client.head('/rest/srpr/1')['ETag']
+        Poll.objects.get(pk=1).tags.remove(Tag.objects.get(pk=2))
+        self.assertNotEqual(self.client.head('/rest/srpr/1')['ETag'], etag)
+
+    def testHeadSinglePoll(self):
+        response = self.client.head('/rest/srpr/1', HTTP_ACCEPT='application/xml')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, '')
+        self.assertEqual(response['Content-Type'], 'text/xml')
+        self.assertEqual(response['X-Item-Count'], '1')
+        self.assertNotEqual(response['ETag'], self.client.head('/rest/srpr/2')['ETag'])
+
+    def testGetPollRange(self):
+        response = self.client.get('/rest/srpr/', HTTP_RANGE='items=0-0')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'items 0-0/2')
+        self.assertEqual(response['Content-Location'], '/rest/srpr/')
+        self.assertTrue('Range' in response['Vary'])
+        self.assertEqual(response.content, '[{"pub_date": "2011-10-20T18:00:00", "question": "What is it about?", "id": 1, "tags": ["/rest/str/1", "/rest/str/2", "/rest/str/3"]}]')
+
+        response = self.client.get('/rest/srpr/', HTTP_RANGE='items=1-24')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'items 1-1/2')
+        self.assertEqual(response.content, '[{"pub_date": "2011-10-20T18:05:00", "question": "Is it about that?", "id": 2, "tags": ["/rest/str/1"]}]')
+
+        response = self.client.get('/rest/srpr/', HTTP_RANGE='items=0-')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'items 0-1/2')
+
+    def testGetPollRangeNotSatisfiable(self):
+        response = self.client.get('/rest/srpr/', HTTP_RANGE='items=2-5')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'items */2')
+
+    def testGetPollInvalidRange(self):
+        for item_range in ('items=1-0', 'bytes=0-10', 'items=a-b'):
+            response = self.client.get('/rest/srpr/', HTTP_RANGE=item_range)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Accept-Ranges'], 'items')
+            self.assertFalse(response.has_header('Content-Range'))
+
+    def testGetEmptyPollRange(self):
+        Poll.objects.all().delete()
+        response = self.client.get('/rest/srpr/', HTTP_RANGE='items=0-24')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Range'], 'items */0')
+        self.assertEqual(response.content, '[]')
+
+    def testHeadPollRange(self):
+        response = self.client.head('/rest/srpr/', HTTP_RANGE='items=0-0')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'items 0-0/2')
+        self.assertEqual(response['X-Item-Count'], '1')
+
+    def testHeadMissingPoll(self):
+        response = self.client.head('/rest/srpr/99')
+        self.assertEqual(response.status_code, 404)
+
+class StandaloneReadMultipleTestCase(BaseTestCase):
+
+    def testGetMultipleInOrder(self):
+        response = self.client.get('/rest/scr/3;1;2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([choice['id'] for choice in json.loads(response.content)], [3, 1, 2])
+
+    def testGetMultipleDuplicates(self):
+        response = self.client.get('/rest/scr/2;1;2;2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([choice['id'] for choice in json.loads(response.content)], [2, 1])
+
+    def testGetMultipleMissing(self):
+        response = self.client.get('/rest/scr/1;9;8')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.content, '')
+
+    def testGetMultipleTooManyIds(self):
+        response = self.client.get('/rest/scr/1;2;3;4')
+        self.assertEqual(response.status_code, 400)
+
+    def testDeleteMultipleMissing(self):
+        response = self.client.delete('/rest/srwpr/1;3')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(Poll.objects.count(), 2)
+
 class StandalonePutOnlyTestCase(BaseTestCase):
 
     def testGetPolls(self):
@@ -63,6 +192,10 @@ class StandalonePostOnlyTestCase(BaseTestCase):
         self.assertEqual(response.status_code, 405)
         self.assertEqual(response.content, '')
 
+    def testHeadPolls(self):
+        response = self.client.head('/rest/spoopr/')
+        self.assertEqual(response.status_code, 405)
+
     def testGetSinglePoll(self):
         response = self.client.get('/rest/spoopr/1')
         self.assertEqual(response.status_code, 405)
@@ -106,6 +239,407 @@ class StandaloneBatchPostTestCase(BaseTestCase):
         self.assertEqual(response["Location"], 'http://' + self.host + "/rest/ropr/3")
         self.assertEqual(count, Poll.objects.all().count()-2)
 
+    def testBatchPostInvalidPoll(self):
+        count = Poll.objects.all().count()
+        post_data = '[{"pub_date": "2011-10-20 19:00:00", "question": "is that allowed?", "tags": [2]}, {"pub_date": "2011-10-20 19:30:00", "tags": [1]}]'
+        response = self.client.post('/rest/sbppr/', post_data, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.content, '[{"error": [{}, {"question": ["This field is required."]}]}]')
+        self.assertEqual(count, Poll.objects.all().count())
+
+    def testBatchPostXmlPoll(self):
+        count = Poll.objects.all().count()
+        post_data = '''<?xml version="1.0" encoding="utf-8"?>
+<objects>
+  <object><pub_date>2011-10-20 19:00:00</pub_date><question>is that allowed?</question><tags>2</tags></object>
+  <object>
+    <pub_date>2011-10-20 19:30:00</pub_date>
+    <question>how is the weather?</question>
+    <tags>1</tags>
+    <tags>3</tags>
+  </object>
+</objects>
+'''
+        response = self.client.post('/rest/sbppr/', post_data, content_type='application/xml')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(count, Poll.objects.all().count()-2)
+        self.assertEqual([tag.id for tag in Poll.objects.get(question='is that allowed?').tags.all()], [2])
+        self.assertEqual([tag.id for tag in Poll.objects.get(question='how is the weather?').tags.order_by('id')], [1, 3])
+
+    def testBatchPostEmptyPoll(self):
+        count = Poll.objects.all().count()
+        # Empty objects are skipped like the empty forms of a formset.
+        post_data = '[{}, {"pub_date": "2011-10-20 19:00:00", "question": "is that allowed?", "tags": [2]}, {"question": " "}]'
+        response = self.client.post('/rest/sbppr/', post_data, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(count, Poll.objects.all().count()-1)
+
+    def testBatchPostNoPoll(self):
+        count = Poll.objects.all().count()
+        # Like an empty formset, a batch without objects is invalid.
+        for post_data in ('[]', '[{}]'):
+            response = self.client.post('/rest/srwpr/', post_data, content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(count, Poll.objects.all().count())
+
+class StandaloneFastValidationTestCase(BaseTestCase):
+
+    def testPostPoll(self):
+        post_data = '{"pub_date": "2011-10-20 19:00:00", "question": "is that allowed?", "tags": [1, 3]}'
+        response = self.client.post('/rest/sfvpr/', post_data, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        poll = Poll.objects.get(question='is that allowed?')
+        self.assertEqual(response['Location'], 'http://localhost:8000/rest/ropr/%d' % (poll.id,))
+        self.assertEqual([tag.id for tag in poll.tags.order_by('id')], [1, 3])
+
+    def testBatchPostInvalidPoll(self):
+        count = Poll.objects.all().count()
+        post_data = '[{"pub_date": "2011-10-20 19:00:00", "question": "is that allowed?", "tags": [2]}, {"pub_date": "2011-10-20 19:30:00", "tags": [1]}]'
+        response = self.client.post('/rest/sfvpr/', post_data, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        # The same errors as the ModelForm.
+        self.assertEqual(response.content, '[{"error": [{}, {"question": ["This field is required."]}]}]')
+        self.assertEqual(count, Poll.objects.all().count())
+
+    def testPostInvalidValues(self):
+        post_data = '[{"pub_date": "yesterday", "question": "%s", "tags": [1, 99]}]' % ('x' * 201,)
+        response = self.client.post('/rest/sfvpr/', post_data, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        errors = json.loads(response.content)[0]['error'][0]
+        self.assertEqual(sorted(errors.keys()), ['pub_date', 'question', 'tags'])
+        self.assertEqual(errors['question'], ['Ensure this value has at most 200 characters (it has 201).'])
+        self.assertEqual(errors['tags'], ['Select a valid choice. 99 is not one of the available choices.'])
+
+    def testPostInvalidTypes(self):
+        for value in ('12', '[1, 2]', '{"date": "2011-10-20"}'):
+            post_data = '[{"pub_date": %s, "question": "is that allowed?", "tags": [1]}]' % (value,)
+            response = self.client.post('/rest/sfvpr/', post_data, content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.content, '[{"error": [{"pub_date": ["Enter a valid date/time."]}]}]')
+
+    def testPostChoices(self):
+        post_data = '[{"poll": 1, "choice": "Yes", "votes": 0}, {"poll": 2, "choice": "No", "votes": 3}]'
+        response = self.client.post('/rest/sfvcr/', post_data, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Choice.objects.get(choice='No').poll_id, 2)
+
+    def testPostChoiceInvalidPoll(self):
+        count = Choice.objects.count()
+        post_data = '[{"poll": 1, "choice": "Yes", "votes": 0}, {"poll": 9, "choice": "No", "votes": "many"}]'
+        response = self.client.post('/rest/sfvcr/', post_data, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        errors = json.loads(response.content)[0]['error']
+        self.assertEqual(errors[0], {})
+        self.assertEqual(errors[1]['poll'], ['Select a valid choice. That choice is not one of the available choices.'])
+        self.assertEqual(sorted(errors[1].keys()), ['poll', 'votes'])
+        self.assertEqual(count, Choice.objects.count())
+
+    def testPutPoll(self):
+        put_data = '{"pub_date": "2011-10-20 19:00:00", "question": "Has it changed?", "tags": [2]}'
+        response = self.client.put('/rest/sfvpr/1', put_data, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, '{"pub_date": "2011-10-20T19:00:00", "question": "Has it changed?", "id": 1, "tags": ["/rest/str/2"]}')
+
+    def testPutMultiplePolls(self):
+        put_data = '{"pub_date": "2011-10-20 19:00:00", "question": "Has it changed?", "tags": [2]}'
+        response = self.client.put('/rest/sfvpr/1;2', put_data, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Poll.objects.filter(question='Has it changed?').count(), 2)
+
+        put_data = '{"pub_date": "2011-10-20 19:00:00"}'
+        response = self.client.put('/rest/sfvpr/1;2', put_data, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+class StandaloneItemStatusTestCase(BaseTestCase):
+
+    def setUp(self):
+        super(StandaloneItemStatusTestCase, self).setUp()
+        # A constraint of the database the forms don't know about.
+        connection.cursor().execute(
+            "CREATE TRIGGER polls_poll_conflict BEFORE INSERT ON polls_poll "
+            "WHEN NEW.question = 'conflict' BEGIN SELECT RAISE(ABORT, 'conflict'); END"
+        )
+
+    def tearDown(self):
+        connection.cursor().execute("DROP TRIGGER IF EXISTS polls_poll_conflict")
+        super(StandaloneItemStatusTestCase, self).tearDown()
+
+    def _post(self, path, *questions):
+        post_data = json.dumps([{"pub_date": "2011-10-20 19:00:00", "question": q, "tags": [1]} for q in questions])
+        return self.client.post(path, post_data, content_type='application/json')
+
+    def testBatchPostPoll(self):
+        response = self._post('/rest/sispr/', 'first?', 'second?', 'third?')
+        self.assertEqual(response.status_code, 207)
+        ids = list(Poll.objects.filter(question__in=['first?', 'second?', 'third?']).order_by('id').values_list('id', flat=True))
+        self.assertEqual(json.loads(response.content), [{"items": [
+            {"status": 201, "location": "/rest/ropr/%d" % (pk,)} for pk in ids
+        ]}])
+
+    def testBatchPostInvalidPoll(self):
+        count = Poll.objects.count()
+        response = self._post('/rest/sispr/', 'first?', '', 'third?')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(json.loads(response.content), [{"items": [
+            {"status": 424},
+            {"status": 400, "error": {"question": ["This field is required."]}},
+            {"status": 424},
+        ]}])
+        self.assertEqual(count, Poll.objects.count())
+
+    def testBatchPostConflict(self):
+        count = Poll.objects.count()
+        response = self._post('/rest/sispr/', 'first?', 'second?', 'conflict', 'fourth?', 'fifth?')
+        self.assertEqual(response.status_code, 207)
+        items = json.loads(response.content)[0]['items']
+        self.assertEqual([item['status'] for item in items], [424, 424, 409, 424, 424])
+        self.assertEqual(items[2]['error'], {"__all__": ["The object could not be saved."]})
+        self.assertEqual(count, Poll.objects.count())
+
+    def testPartialBatchPost(self):
+        count = Poll.objects.count()
+        response = self._post('/rest/sppr/', 'first?', '', 'conflict', 'fourth?', 'fifth?')
+        self.assertEqual(response.status_code, 207)
+        items = json.loads(response.content)[0]['items']
+        self.assertEqual([item['status'] for item in items], [201, 400, 409, 201, 201])
+        self.assertEqual(count + 3, Poll.objects.count())
+        for item in (items[0], items[3], items[4]):
+            pk = int(item['location'].rsplit('/', 1)[1])
+            self.assertEqual(Poll.objects.get(pk=pk).tags.count(), 1)
+        self.assertEqual(sorted(Poll.objects.filter(question__in=['first?', 'fourth?', 'fifth?']).values_list('question', flat=True)), ['fifth?', 'first?', 'fourth?'])
+
+class StandaloneIdempotencyTestCase(BaseTestCase):
+
+    post_data = '{"pub_date": "2011-10-20 19:00:00", "question": "is that allowed?", "tags": [2]}'
+
+    def setUp(self):
+        super(StandaloneIdempotencyTestCase, self).setUp()
+        idempotency.get_idempotency_cache().clear()
+
+    def _post(self, key, post_data=None):
+        return self.client.post('/rest/sidpr/', post_data or self.post_data, content_type='application/json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def testRepeatedPost(self):
+        count = Poll.objects.count()
+        response = self._post('abc')
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse('Idempotent-Replayed' in response)
+        replayed = self._post('abc')
+        self.assertEqual(replayed.status_code, 201)
+        self.assertEqual(replayed['Idempotent-Replayed'], 'true')
+        self.assertEqual(replayed['Location'], response['Location'])
+        self.assertEqual(count + 1, Poll.objects.count())
+
+    def testFingerprintWhileReading(self):
+        request = RequestFactory().post('/rest/sidpr/', self.post_data, content_type='application/json')
+        expected = idempotency._HashingStream(request).get_fingerprint()
+        request = RequestFactory().post('/rest/sidpr/', self.post_data, content_type='application/json')
+        stream = request._stream = idempotency._HashingStream(request)
+        # The body is hashed while it is read, without keeping it.
+        self.assertEqual(request.read(10) + request.read(), self.post_data)
+        self.assertEqual(stream.get_fingerprint(), expected)
+        self.assertFalse(hasattr(request, '_body'))
+
+    def testDifferentKeys(self):
+        count = Poll.objects.count()
+        self.assertEqual(self._post('abc').status_code, 201)
+        self.assertEqual(self._post('def').status_code, 201)
+        self.assertEqual(count + 2, Poll.objects.count())
+
+    def testPostWithoutKey(self):
+        count = Poll.objects.count()
+        for i in range(2):
+            response = self.client.post('/rest/sidpr/', self.post_data, content_type='application/json')
+            self.assertEqual(response.status_code, 201)
+        self.assertEqual(count + 2, Poll.objects.count())
+
+    def testReusedKey(self):
+        self.assertEqual(self._post('abc').status_code, 201)
+        response = self._post('abc', '{"pub_date": "2011-10-20 19:00:00", "question": "something else?"}')
+        self.assertEqual(response.status_code, 422)
+
+    def testReplayedError(self):
+        count = Poll.objects.count()
+        response = self._post('abc', '{"pub_date": "2011-10-20 19:00:00"}')
+        self.assertEqual(response.status_code, 400)
+        replayed = self._post('abc', '{"pub_date": "2011-10-20 19:00:00"}')
+        self.assertEqual(replayed.status_code, 400)
+        self.assertEqual(replayed.content, response.content)
+        self.assertEqual(count, Poll.objects.count())
+
+    @override_settings(RIV_IDEMPOTENCY_WAIT=0)
+    def testConcurrentPost(self):
+        # Another request with the same key is being executed.
+        lock_key = 'riv-idempotency:%s:lock' % (idempotency._digest('rest1', 'addr:127.0.0.1', 'abc'),)
+        idempotency.get_idempotency_cache().add(lock_key, True)
+        count = Poll.objects.count()
+        response = self._post('abc')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(count, Poll.objects.count())
+
+class StandaloneCacheTestCase(BaseTestCase):
+
+    def setUp(self):
+        super(StandaloneCacheTestCase, self).setUp()
+        caching.get_response_cache('default').clear()
+        # The fixtures have been loaded in the transaction of the test.
+        caching.invalidate_pending()
+
+    def assertCached(self, path, **extra):
+        response = self.client.get(path, **extra)
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(0):
+            cached = self.client.get(path, **extra)
+        self.assertEqual(cached.status_code, 200)
+        self.assertEqual(cached.content, response.content)
+        self.assertEqual(cached['Content-Type'], response['Content-Type'])
+        return response
+
+    def testGetCached(self):
+        self.assertCached('/rest/scpr/')
+        self.assertCached('/rest/scpr/1')
+        self.assertCached('/rest/scpr/1;2')
+
+    def testVary(self):
+        json_response = self.assertCached('/rest/scpr/1')
+        xml_response = self.assertCached('/rest/scpr/1', HTTP_ACCEPT='application/xml')
+        self.assertNotEqual(json_response.content, xml_response.content)
+        # The query is part of the key.
+        response = self.client.get('/rest/scpr/1?format=xml')
+        self.assertEqual(response.content, xml_response.content)
+
+    def testHead(self):
+        response = self.assertCached('/rest/scpr/1')
+        with self.assertNumQueries(0):
+            head = self.client.head('/rest/scpr/1')
+        self.assertEqual(head.status_code, 200)
+        self.assertEqual(head.content, '')
+        self.assertEqual(head['Content-Length'], str(len(response.content)))
+
+    def testInvalidateOnSave(self):
+        self.assertCached('/rest/scpr/1')
+        poll = Poll.objects.get(pk=1)
+        poll.question = 'Has it changed?'
+        poll.save()
+        response = self.client.get('/rest/scpr/1')
+        self.assertEqual(json.loads(response.content)['question'], 'Has it changed?')
+
+    def testInvalidateOnRelatedChange(self):
+        self.assertCached('/rest/scpr/1')
+        tag = Tag.objects.get(pk=1)
+        tag.name = 'renamed'
+        tag.save()
+        response = self.client.get('/rest/scpr/1')
+        self.assertTrue('renamed' in [t['name'] for t in json.loads(response.content)['tags']])
+
+        self.assertCached('/rest/scpr/1')
+        Poll.objects.get(pk=1).tags.remove(tag)
+        self.assertFalse('renamed' in [t['name'] for t in json.loads(self.client.get('/rest/scpr/1').content)['tags']])
+
+    def testInvalidateOnBulkWrite(self):
+        response = self.assertCached('/rest/scpr/')
+        cache = caching.get_response_cache('default')
+        generation = cache.get(caching.get_generation_key(Tag))
+        # Bulk inserts don't send signals.
+        post_data = '[{"name": "first"}, {"name": "second"}]'
+        self.assertEqual(self.client.post('/rest/sbulktr/', post_data, content_type='application/json').status_code, 204)
+        self.assertNotEqual(cache.get(caching.get_generation_key(Tag)), generation)
+
+    def testBulkDeletionWithCache(self):
+        # A cached resource of the model doesn't disable the fast path.
+        caching.ResponseCache(ResourceOptions(type('Meta', (), {'model': Choice, 'cache': True})))
+        self.assertTrue(StandaloneWrapper()._can_bulk_delete(Choice))
+        cache = caching.get_response_cache('default')
+        generation = cache.get(caching.get_generation_key(Choice))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.delete('/rest/sbdcr/1;2')
+        self.assertEqual(response['X-Deleted-Count'], '2')
+        # The objects are not loaded.
+        self.assertFalse([q for q in queries.captured_queries if '"polls_choice"."choice"' in q['sql']])
+        self.assertNotEqual(cache.get(caching.get_generation_key(Choice)), generation)
+
+    def testInvalidateCascade(self):
+        caching.ResponseCache(ResourceOptions(type('Meta', (), {'model': Choice, 'cache': True})))
+        cache = caching.get_response_cache('default')
+        generation = cache.get(caching.get_generation_key(Choice))
+        # The choices of the poll are deleted along with it.
+        self.assertEqual(self.client.delete('/rest/srwpr/1').status_code, 204)
+        self.assertNotEqual(cache.get(caching.get_generation_key(Choice)), generation)
+
+    def testVaryUser(self):
+        self.assertCached('/rest/scpr/1')
+        User.objects.create_user('user', password='secret')
+        self.assertTrue(self.client.login(username='user', password='secret'))
+        # The response cached for anonymous users is not used.
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/rest/scpr/1')
+        self.assertTrue(self._poll_queries(queries))
+        # Only the session and the user are loaded for the cached response.
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/rest/scpr/1')
+        self.assertFalse(self._poll_queries(queries))
+
+    def _poll_queries(self, queries):
+        return [query for query in queries.captured_queries if 'polls_' in query['sql']]
+
+    def testAuthorizationNotCached(self):
+        for i in range(2):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get('/rest/scpr/1', HTTP_AUTHORIZATION='Basic dXNlcjpzZWNyZXQ=')
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(self._poll_queries(queries))
+
+    def testInvalidateAfterTransaction(self):
+        cache = caching.get_response_cache('default')
+        key = caching.get_generation_key(Poll)
+        self.assertCached('/rest/scpr/1')
+        # The test runs in a transaction. A concurrent request might cache
+        # the old data with the new generation.
+        caching.invalidate(Poll)
+        generation = cache.get(key)
+        caching.invalidate_pending()
+        self.assertEqual(cache.get(key), generation + 1)
+        caching.invalidate_pending()
+        self.assertEqual(cache.get(key), generation + 1)
+
+class StandaloneBulkPostTestCase(BaseTestCase):
+
+    def testBulkPostTag(self):
+        count = Tag.objects.count()
+        post_data = '[{"name": "first"}, {"name": "second"}, {"name": "third"}]'
+        response = self.client.post('/rest/sbulktr/', post_data, content_type='application/json')
+        self.assertEqual(response.status_code, 204)
+        pk = int(response['Location'].rsplit('/', 1)[1])
+        self.assertEqual(Tag.objects.get(pk=pk).name, 'first')
+        self.assertEqual(count + 3, Tag.objects.count())
+
+    def testBulkPostInvalidTag(self):
+        count = Tag.objects.count()
+        post_data = '[{"name": "first"}, {"name": "%s"}]' % ('x' * 101,)
+        response = self.client.post('/rest/sbulktr/', post_data, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(count, Tag.objects.count())
+
+    def testBulkPostMalformedTag(self):
+        count = Tag.objects.count()
+        # The first chunks are saved before the malformed object is read.
+        post_data = '[{"name": "first"}, {"name": "second"}, {"name": '
+        response = self.client.post('/rest/sbulktr/', post_data, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(count, Tag.objects.count())
+
+    def testBulkPostWithoutRelations(self):
+        count = Choice.objects.count()
+        post_data = '[{"poll": 1, "choice": "first", "votes": 0}, {"poll": 1, "choice": "second", "votes": 1}, {"poll": 2, "choice": "third", "votes": 2}]'
+        response = self.client.post('/rest/sbulkcr/', post_data, content_type='application/json')
+        self.assertEqual(response.status_code, 204)
+        # The first object has been saved on its own to get its id.
+        pk = int(response['Location'].rsplit('/', 1)[1])
+        self.assertEqual(Choice.objects.get(pk=pk).choice, 'first')
+        self.assertEqual(count + 3, Choice.objects.count())
+        self.assertEqual(Choice.objects.get(choice='third').poll_id, 2)
+
 class StandaloneDeleteOnlyTestCase(BaseTestCase):
 
     def testGetPolls(self):
@@ -136,6 +670,160 @@ class StandaloneDeleteOnlyTestCase(BaseTestCase):
         self.assertEqual(response.status_code, 204)
         self.assertEqual(count, Poll.objects.all().count()+1)
 
+class StandaloneBulkDeleteTestCase(BaseTestCase):
+
+    def testDeleteSingleChoice(self):
+        count = Choice.objects.all().count()
+        response = self.client.delete('/rest/sbdcr/1')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(count, Choice.objects.all().count()+1)
+
+    def testDeleteListChoice(self):
+        count = Choice.objects.all().count()
+        response = self.client.delete('/rest/sbdcr/1;2;3')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(response['X-Deleted-Count'], '3')
+        self.assertEqual(count, Choice.objects.all().count()+3)
+
+    def testDeleteChunks(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.delete('/rest/sbdcr/1;2;3')
+        self.assertEqual(response.status_code, 204)
+        # Each chunk of two objects is written in its own transaction
+        # (a savepoint within the transaction of the test).
+        statements = [re.findall(r'\b(DELETE|SAVEPOINT|RELEASE)\b', q['sql'])[:1] for q in queries.captured_queries]
+        statements = [words[0] for words in statements if words]
+        self.assertEqual(statements, ['SAVEPOINT', 'DELETE', 'RELEASE', 'SAVEPOINT', 'DELETE', 'RELEASE'])
+
+    def testDeleteListMissingChoice(self):
+        count = Choice.objects.all().count()
+        response = self.client.delete('/rest/sbdcr/1;2;99')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(count, Choice.objects.all().count())
+
+    def testDeleteAllChoiceNotAllowed(self):
+        count = Choice.objects.all().count()
+        response = self.client.delete('/rest/sbdcr/')
+        self.assertEqual(response.status_code, 405)
+        self.assertEqual(count, Choice.objects.all().count())
+
+    def testDeleteAllChoice(self):
+        count = Choice.objects.all().count()
+        response = self.client.delete('/rest/sbbdcr/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(response['X-Deleted-Count'], str(count))
+        self.assertEqual(Choice.objects.all().count(), 0)
+
+class StandaloneExportTestCase(BaseTestCase):
+
+    def setUp(self):
+        super(StandaloneExportTestCase, self).setUp()
+        self.export_dir = tempfile.mkdtemp()
+        # Jobs are executed immediately. Worker threads can not access
+        # the in-memory test database.
+        self.settings_override = override_settings(RIV_EXPORT_DIR=self.export_dir, RIV_EXPORT_WORKERS=0)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.export_dir)
+
+    def testExportPolls(self):
+        response = self.client.get('/rest/sexpr/')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.content, '[{"status": "done"}]')
+        location = response['Location']
+        self.assertTrue(location.startswith('http://localhost:8000/rest/sexpr/exports/'))
+
+        response = self.client.get(location)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(''.join(response.streaming_content), '[{"pub_date": "2011-10-20T18:00:00", "question": "What is it about?", "id": 1, "tags": ["/rest/str/1", "/rest/str/2", "/rest/str/3"]}, {"pub_date": "2011-10-20T18:05:00", "question": "Is it about that?", "id": 2, "tags": ["/rest/str/1"]}]')
+
+        response = self.client.delete(location)
+        self.assertEqual(response.status_code, 204)
+        response = self.client.get(location)
+        self.assertEqual(response.status_code, 404)
+
+    def testSmallList(self):
+        Poll.objects.filter(pk=2).delete()
+        # Lists below the threshold are returned right away.
+        response = self.client.get('/rest/sexpr/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(json.loads(response.content)), 1)
+
+    def testUrlContext(self):
+        # The worker threads don't share the script prefix of the request.
+        job = exports.ExportJob(uuid.uuid4().hex, 'sexpr', 'json')
+        job.run(list(Poll.objects.filter(pk=2)), {'api_name': 'rest1'}, ('/app/', None))
+        with open(job.data_path) as f:
+            self.assertTrue('"/app/rest/str/1"' in f.read())
+        self.assertEqual(get_script_prefix(), '/')
+
+    def testExportFormat(self):
+        response = self.client.get('/rest/sexpr/', HTTP_ACCEPT='application/xml')
+        self.assertEqual(response.status_code, 202)
+        response = self.client.get(response['Location'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/xml')
+        self.assertTrue('<question>Is it about that?</question>' in ''.join(response.streaming_content))
+
+    def testGetPollRange(self):
+        response = self.client.get('/rest/sexpr/', HTTP_RANGE='items=0-0')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'items 0-0/2')
+
+    def testHeadPolls(self):
+        response = self.client.head('/rest/sexpr/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Item-Count'], '2')
+
+    def testGetSinglePoll(self):
+        response = self.client.get('/rest/sexpr/1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, '{"pub_date": "2011-10-20T18:00:00", "question": "What is it about?", "id": 1, "tags": ["/rest/str/1", "/rest/str/2", "/rest/str/3"]}')
+
+    def testUnknownJob(self):
+        response = self.client.get('/rest/sexpr/')
+        job_id = response['Location'].rstrip('/').split('/')[-1]
+        response = self.client.get('/rest/sexpr/exports/%s' % ('0' * 32,))
+        self.assertEqual(response.status_code, 404)
+        # The job belongs to another resource.
+        response = self.client.get('/rest/srpr/exports/%s' % (job_id,))
+        self.assertEqual(response.status_code, 404)
+
+    def testPostNotAllowed(self):
+        response = self.client.get('/rest/sexpr/')
+        response = self.client.post(response['Location'], '{}', content_type='application/json')
+        self.assertEqual(response.status_code, 405)
+
+    def testExpiredJob(self):
+        location = self.client.get('/rest/sexpr/')['Location']
+        job = exports.get_job(location.rstrip('/').split('/')[-1])
+        expired = time.time() - exports.get_ttl() - 1
+        os.utime(job.state_path, (expired, expired))
+        response = self.client.get(location)
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(os.path.exists(job.data_path))
+
+    def testStaleJob(self):
+        # The process running the job has been restarted.
+        job = exports.ExportJob(uuid.uuid4().hex, 'sexpr', 'json', created=time.time() - exports.get_timeout() - 1)
+        job.save()
+        response = self.client.get('/rest/sexpr/exports/%s' % (job.job_id,))
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(exports.get_job(job.job_id).status, exports.FAILED)
+
+    def testCleanup(self):
+        location = self.client.get('/rest/sexpr/')['Location']
+        job = exports.get_job(location.rstrip('/').split('/')[-1])
+        other_path = os.path.join(self.export_dir, 'README')
+        open(other_path, 'w').close()
+        exports.cleanup(time.time() + exports.get_ttl() + 1)
+        self.assertFalse(os.path.exists(job.state_path))
+        self.assertFalse(os.path.exists(job.data_path))
+        self.assertTrue(os.path.exists(other_path))
+
 class StandaloneReadWriteTestCase(BaseTestCase):
 
     def testGetPolls(self):
@@ -173,6 +861,44 @@ class StandaloneReadWriteTestCase(BaseTestCase):
         response = self.client.put('/rest/srwpr/1', put_data, content_type='application/json')
         self.assertEqual(response.status_code, 400)
 
+    def testPutMultiplePolls(self):
+        put_data = '[{"pub_date": "2011-10-20 19:00:00", "question": "is that allowed?", "tags": [3]}, {"pub_date": "2011-10-20 18:05:00", "question": "how is the weather?", "tags": [1]}]'
+        response = self.client.put('/rest/srwpr/1;2', put_data, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, '[{"pub_date": "2011-10-20T19:00:00", "question": "is that allowed?", "id": 1, "tags": ["/rest/str/3"]}, {"pub_date": "2011-10-20T18:05:00", "question": "how is the weather?", "id": 2, "tags": ["/rest/str/1"]}]')
+        response = self.client.get('/rest/srwpr/')
+        self.assertEqual(response.content, '[{"pub_date": "2011-10-20T19:00:00", "question": "is that allowed?", "id": 1, "tags": ["/rest/str/3"]}, {"pub_date": "2011-10-20T18:05:00", "question": "how is the weather?", "id": 2, "tags": ["/rest/str/1"]}]')
+
+    def testPutSingleEntityToMultiplePolls(self):
+        put_data = '{"pub_date": "2011-10-20 19:00:00", "question": "is that allowed?", "tags": [2]}'
+        response = self.client.put('/rest/srwpr/2;1', put_data, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get('/rest/srwpr/')
+        self.assertEqual(response.content, '[{"pub_date": "2011-10-20T19:00:00", "question": "is that allowed?", "id": 1, "tags": ["/rest/str/2"]}, {"pub_date": "2011-10-20T19:00:00", "question": "is that allowed?", "id": 2, "tags": ["/rest/str/2"]}]')
+
+    def testPutMultiplePollsSingleUpdate(self):
+        put_data = '[{"pub_date": "2011-10-20 19:00:00", "question": "first?", "tags": [3]}, {"pub_date": "2011-10-21 18:05:00", "question": "second?", "tags": [1]}]'
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.put('/rest/srwpr/1;2', put_data, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        # Distinct values are written by a single UPDATE.
+        self.assertEqual(len([q for q in queries.captured_queries if 'UPDATE "polls_poll" ' in q['sql']]), 1)
+        self.assertEqual(list(Poll.objects.order_by('id').values_list('question', 'pub_date')), [
+            ('first?', datetime.datetime(2011, 10, 20, 19, 0)), ('second?', datetime.datetime(2011, 10, 21, 18, 5))
+        ])
+
+    def testPutMultipleMissingPoll(self):
+        put_data = '{"pub_date": "2011-10-20 19:00:00", "question": "is that allowed?", "tags": [2]}'
+        response = self.client.put('/rest/srwpr/1;5', put_data, content_type='application/json')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(Poll.objects.get(pk=1).question, 'What is it about?')
+
+    def testPutMultipleErrorPoll(self):
+        put_data = '[{"pub_date": "2011-10-20 19:00:00", "question": "is that allowed?", "tags": [3]}, {"pub_date": "2011-10-20 18:05:00", "question": "", "tags": [1]}]'
+        response = self.client.put('/rest/srwpr/1;2', put_data, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Poll.objects.get(pk=1).question, 'What is it about?')
+
     def testDeleteSinglePoll(self):
         count = Poll.objects.all().count()
         response = self.client.delete('/rest/srwpr/1')
@@ -1,4 +1,5 @@
 import datetime
+import json
 
 from django.test import Client, TestCase
 from django.core import serializers
@@ -322,3 +323,21 @@ class XmlSerializerTestCase(BaseSerializerTestCase):
         serialized_xml = ET.fromstring(serializers.serialize('restxml', self.choice1, inline=['poll',], map_fields={'poll__pub_date': 'polldate'}))
         self.assertTrue(xml_compare(result_xml, serialized_xml))
 
+
+class JsonSerializerTestCase(BaseSerializerTestCase):
+
+    def testSerializeStreaming(self):
+        serializer = serializers.get_serializer('restjson')()
+        serialized = serializer.serialize(Poll.objects.all(), inline=['tags'])
+        # The objects are written to the stream right away.
+        self.assertEqual(serializer.objects, [])
+        self.assertEqual(json.loads(serialized), json.loads(serializers.serialize('restjson', Poll.objects.all(), inline=['tags'], indent=2)))
+
+    def testSerializeStreamingSingle(self):
+        self.assertEqual(
+            serializers.serialize('restjson', self.poll2),
+            '{"pub_date": "2011-10-20T18:05:00", "question": "Is it about that?", "id": 2, "tags": [1]}'
+        )
+
+    def testSerializeStreamingEmpty(self):
+        self.assertEqual(serializers.serialize('restjson', Poll.objects.none()), '[]')
@@ -1,6 +1,8 @@
 import datetime
 from django.test import Client, TestCase
+from riv.info import RestInformation
 from riv.utils import traverse_dict
+from polls.resources import StandaloneReadOnlyPollResource
 from polls.tests import BaseTestCase
 
 class BaseTraverseTestCase(BaseTestCase):
@@ -45,3 +47,10 @@ class BaseTraverseTestCase(BaseTestCase):
             [{'c': 'value1'}, {'c': 'value2'}]
         )
 
+class RestInformationTestCase(BaseTestCase):
+
+    def testCustomAttribute(self):
+        # Views and wrappers may store their own data.
+        rest_info = RestInformation(StandaloneReadOnlyPollResource._meta)
+        rest_info.custom = 'value'
+        self.assertEqual(rest_info.custom, 'value')
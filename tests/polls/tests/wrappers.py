@@ -0,0 +1,81 @@
+from django import forms
+from django.core.exceptions import ValidationError
+from django.db import models
+
+from riv.exceptions import ConfigurationError
+from riv.resources import Resource
+from riv.validators import compile_field
+from riv.wrappers import BaseWrapper, StandaloneWrapper
+from polls.forms import PollForm
+from polls.models import Poll, Choice
+from polls.tests import BaseTestCase
+
+class HandlerTestCase(BaseTestCase):
+
+    def setUp(self):
+        self.wrapper = StandaloneWrapper()
+
+    def testSpecificHandler(self):
+        self.assertEqual(self.wrapper.get_handler_for('POST_list'), self.wrapper.create_multiple)
+        self.assertEqual(self.wrapper.get_handler_for('GET_multiple'), self.wrapper.read)
+
+    def testFallbackHandler(self):
+        class FallbackWrapper(BaseWrapper):
+            handler_methods = {'GET': 'read', 'GET_list': 'read_multiple'}
+        wrapper = FallbackWrapper()
+        self.assertEqual(wrapper.get_handler_for('GET_object'), wrapper.read)
+        self.assertEqual(wrapper.get_handler_for('GET_multiple'), wrapper.read)
+        self.assertEqual(wrapper.get_handler_for('GET_list'), wrapper.read_multiple)
+        self.assertRaises(AttributeError, wrapper.get_handler_for, 'POST_object')
+
+    def testModuleHandler(self):
+        class ModuleWrapper(BaseWrapper):
+            handler_methods = {'GET': 'polls.views.poll_detail'}
+        from polls.views import poll_detail
+        self.assertEqual(ModuleWrapper().get_handler_for('GET_object'), poll_detail)
+
+    def testInvalidHandler(self):
+        class InvalidWrapper(BaseWrapper):
+            handler_methods = {'GET': 'read_nothing'}
+        def create_resource():
+            class InvalidResource(Resource):
+                _wrapper = InvalidWrapper()
+        self.assertRaises(ConfigurationError, create_resource)
+
+class FormClassTestCase(BaseTestCase):
+
+    def testCachedFormClass(self):
+        wrapper = StandaloneWrapper()
+        form_class = wrapper.get_form_class(Poll)
+        self.assertTrue(issubclass(form_class, forms.ModelForm))
+        self.assertEqual(form_class._meta.model, Poll)
+        self.assertTrue(wrapper.get_form_class(Poll) is form_class)
+        self.assertEqual(wrapper.get_form_class(Choice)._meta.model, Choice)
+        # Form classes are not shared between wrappers.
+        self.assertFalse(StandaloneWrapper().get_form_class(Poll) is form_class)
+
+    def testCustomFormClass(self):
+        class PollWrapper(StandaloneWrapper):
+            form_class = PollForm
+        self.assertEqual(PollWrapper().get_form_class(Poll), PollForm)
+
+class CompileFieldTestCase(BaseTestCase):
+
+    def testCallableDefault(self):
+        values = iter([1, 2])
+        field = models.IntegerField(blank=True, default=lambda: next(values))
+        clean = compile_field(field)
+        # The default is computed for each missing value.
+        self.assertEqual([clean(None), clean('')], [1, 2])
+        self.assertEqual(clean('3'), 3)
+
+    def testInvalidType(self):
+        clean = compile_field(models.DateTimeField())
+        # The message of the form field, like the ModelForm.
+        for value in (12, [1, 2], {'date': '2011-10-20'}):
+            try:
+                clean(value)
+            except ValidationError, e:
+                self.assertEqual(e.messages, [u'Enter a valid date/time.'])
+            else:
+                self.fail('%r is not a valid date/time' % (value,))
@@ -6,7 +6,11 @@ from polls.resources import StandaloneReadOnlyChoiceResource, ReadOnlyPollResour
         StandalonePutOnlyPollResource, StandalonePostOnlyPollResource, StandaloneDeleteOnlyPollResource, \
         BatchPostPollResource, BatchDeletePollResource, ReadWriteRenderPollResource, ResultResource, \
         NoFallbackPollResource, RelatedAsIdsPollResource, FieldsPollResource, ExcludePollResource, \
-        InlinePollResource, ExtraPollResource, MapPollResource, StandaloneBatchPostPollResource
+        InlinePollResource, ExtraPollResource, MapPollResource, StandaloneBatchPostPollResource, \
+        StandaloneBulkPostTagResource, StandaloneBulkDeleteChoiceResource, StandaloneBulkBatchDeleteChoiceResource, \
+        StandaloneExportPollResource, StandaloneFastValidationPollResource, StandaloneFastValidationChoiceResource, \
+        StandaloneItemStatusPollResource, StandalonePartialPostPollResource, StandaloneIdempotentPollResource, \
+        StandaloneLimitedPollResource, StandaloneCachedPollResource, StandaloneBulkPostChoiceResource
 
 from riv.api import Api
 
@@ -32,13 +36,25 @@ api.register(InlinePollResource(name='ipr'))
 api.register(ExtraPollResource(name='extpr'))
 api.register(MapPollResource(name='mpr'))
 api.register(StandaloneReadOnlyPollResource(name='srpr'))
+api.register(StandaloneExportPollResource(name='sexpr'))
 api.register(StandalonePutOnlyPollResource(name='spuopr'))
 api.register(StandalonePostOnlyPollResource(name='spoopr'))
 api.register(StandaloneBatchPostPollResource(name='sbppr'))
+api.register(StandaloneBulkPostTagResource(name='sbulktr'))
+api.register(StandaloneBulkPostChoiceResource(name='sbulkcr'))
+api.register(StandaloneFastValidationPollResource(name='sfvpr'))
+api.register(StandaloneItemStatusPollResource(name='sispr'))
+api.register(StandalonePartialPostPollResource(name='sppr'))
+api.register(StandaloneIdempotentPollResource(name='sidpr'))
+api.register(StandaloneLimitedPollResource(name='slpr'))
+api.register(StandaloneCachedPollResource(name='scpr'))
+api.register(StandaloneFastValidationChoiceResource(name='sfvcr'))
 api.register(StandaloneDeleteOnlyPollResource(name='sdopr'))
 api.register(StandaloneReadWritePollResource(name='srwpr'))
 api.register(StandaloneReadWritePollResource2(name='srwpr2'))
 api.register(StandaloneReadOnlyChoiceResource(name='scr'))
+api.register(StandaloneBulkDeleteChoiceResource(name='sbdcr'))
+api.register(StandaloneBulkBatchDeleteChoiceResource(name='sbbdcr'))
 api.register(StandaloneExcludeGetOnly(name='sego'))
 api.register(StandaloneExcludePostOnly(name='sepo'))
 api.register(StandaloneExcludePutOnly(name='sepuo'))
@@ -50,4 +66,6 @@ urlpatterns = patterns('',
     (r'^accounts/login/$', 'django.contrib.auth.views.login', {'template_name': 'login.html'}),
     (r'^polls/', include('polls.urls')),
     (r'^rest/', include(api.urls)),
+    # Paths that don't belong to a resource fall through the Api.
+    (r'^rest/legacy/', include('polls.urls')),
 )